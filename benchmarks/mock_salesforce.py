@@ -0,0 +1,326 @@
+import re
+import gzip
+import json
+import time
+import random
+import threading
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+API_PREFIX = "/services/data/v63.0"
+
+_LIMIT_PATTERN = re.compile(r"\blimit\s+(\d+)", re.IGNORECASE)
+_ID_FILTER_PATTERN = re.compile(r"\bId\s*(>=|<)\s*'(\w+)'", re.IGNORECASE)
+_ID_ONLY_PATTERN = re.compile(r"^\s*select\s+id\s+from\b", re.IGNORECASE)
+_MODSTAMP_FILTER_PATTERN = re.compile(r"\bSystemModstamp\s*>=\s*(\S+Z)", re.IGNORECASE)
+_MODSTAMP_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+_DESCENDING_PATTERN = re.compile(r"\border\s+by\s+id\s+desc\b", re.IGNORECASE)
+
+
+def _field(name: str, field_type: str = "string", reference_to: Optional[list] = None,
+           relationship_name: Optional[str] = None) -> dict:
+    return {"name": name, "label": name, "type": field_type, "referenceTo": reference_to or [],
+            "relationshipName": relationship_name, "filterable": True, "sortable": True, "nillable": True,
+            "custom": False, "picklistValues": []}
+
+
+_SCHEMA = {
+    "Opportunity": {
+        "name": "Opportunity", "label": "Opportunity", "keyPrefix": "006", "queryable": True,
+        "fields": [_field("Id", "id"), _field("Name"), _field("Amount", "currency"), _field("StageName", "picklist"),
+                   _field("IsClosed", "boolean"), _field("CloseDate", "date"),
+                   _field("SystemModstamp", "datetime"),
+                   _field("AccountId", "reference", ["Account"], "Account")],
+        "childRelationships": []
+    },
+    "Account": {
+        "name": "Account", "label": "Account", "keyPrefix": "001", "queryable": True,
+        "fields": [_field("Id", "id"), _field("Name"), _field("Industry", "picklist")],
+        "childRelationships": [{"relationshipName": "Opportunities", "childSObject": "Opportunity",
+                                "field": "AccountId"}]
+    }
+}
+
+
+class MockSalesforceServer:
+    def __init__(self, total_records: int = 1000, latency_ms: float = 0.0, error_rate: float = 0.0,
+                 session_seconds: int = 7200, api_limit: int = 15000):
+        self.total_records = total_records
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.session_seconds = session_seconds
+        self.api_limit = api_limit
+        self.api_used = 0
+        self.logins = 0
+        self.requests = 0
+        self.valid_sessions: set[str] = set()
+        self.deleted_records: list[dict] = []
+        self.schema_modified = "Wed, 01 Jan 2025 00:00:00 GMT"
+        self.plan = {"leadingOperationType": "Index", "relativeCost": 0.2, "cardinality": 100,
+                     "sobjectCardinality": total_records, "sobjectType": "Opportunity", "fields": ["Id"], "notes": []}
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def start(self) -> "MockSalesforceServer":
+        handler = type("BoundHandler", (_MockHandler,), {"mock": self})
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def expire_sessions(self) -> None:
+        with self._lock:
+            self.valid_sessions.clear()
+
+    def new_session(self) -> str:
+        with self._lock:
+            self.logins += 1
+            session_id = f"00DMOCK!{self.logins:08d}"
+            self.valid_sessions.add(session_id)
+            return session_id
+
+    def count_request(self) -> int:
+        with self._lock:
+            self.requests += 1
+            self.api_used += 1
+            return self.api_used
+
+    @staticmethod
+    def record_id(index: int) -> str:
+        return f"006{index:012d}AAA"
+
+    def index_of(self, record_id: str) -> int:
+        low, high = 0, self.total_records
+        while low < high:
+            middle = (low + high) // 2
+            if self.record_id(middle)[:15] < record_id[:15]:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @staticmethod
+    def modstamp(index: int) -> str:
+        return (_MODSTAMP_EPOCH + timedelta(seconds=index)).strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+
+    @staticmethod
+    def record(index: int, id_only: bool = False) -> dict:
+        record_id = MockSalesforceServer.record_id(index)
+        attributes = {"type": "Opportunity", "url": f"{API_PREFIX}/sobjects/Opportunity/{record_id}"}
+        if id_only:
+            return {"attributes": attributes, "Id": record_id}
+        return {
+            "attributes": attributes,
+            "Id": record_id,
+            "Name": f"Opportunity {index}",
+            "Amount": round(1000 + index * 1.5, 2),
+            "StageName": ("Prospecting", "Negotiation", "Closed Won")[index % 3],
+            "IsClosed": index % 3 == 2,
+            "CloseDate": "2025-06-30",
+            "SystemModstamp": MockSalesforceServer.modstamp(index),
+            "Account": {
+                "attributes": {"type": "Account", "url": f"{API_PREFIX}/sobjects/Account/001{index % 97:015d}"},
+                "Name": f"Account {index % 97}"
+            }
+        }
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    mock: MockSalesforceServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except ConnectionResetError:
+            self.close_connection = True
+
+    def _send(self, status: int, body, content_type: str = "application/json", headers: Optional[dict] = None):
+        payload = body if isinstance(body, bytes) else (
+            body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8"))
+
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type};charset=UTF-8")
+        self.send_header("Sforce-Limit-Info", f"api-usage={self.mock.api_used}/{self.mock.api_limit}")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if "gzip" in self.headers.get("Accept-Encoding", "") and len(payload) > 1024:
+            payload = gzip.compress(payload, compresslevel=5)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _simulate_latency(self) -> None:
+        if self.mock.latency_ms:
+            time.sleep(self.mock.latency_ms / 1000)
+
+    def _inject_error(self) -> bool:
+        if self.mock.error_rate and random.random() < self.mock.error_rate:
+            self._send(503, [{"errorCode": "SERVER_UNAVAILABLE", "message": "Injected transient failure"}])
+            return True
+        return False
+
+    def _authorized(self) -> bool:
+        session_id = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        if session_id in self.mock.valid_sessions:
+            return True
+        self._send(401, [{"errorCode": "INVALID_SESSION_ID", "message": "Session expired or invalid"}])
+        return False
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._simulate_latency()
+
+        if self.path.startswith("/services/Soap/u/"):
+            if b"<urn:username>" not in body:
+                return self._send(500, _soap_fault("INVALID_LOGIN", "Invalid username or password"), "text/xml")
+            session_id = self.mock.new_session()
+            return self._send(200, _soap_login_response(self.mock.url, session_id, self.mock.session_seconds),
+                              "text/xml")
+
+        if self.path == "/services/oauth2/token":
+            form = urllib.parse.parse_qs(body.decode("utf-8"))
+            grant_type = form.get("grant_type", [""])[0]
+            if grant_type == "client_credentials":
+                authorized = bool(form.get("client_id") and form.get("client_secret"))
+            elif grant_type == "urn:ietf:params:oauth:grant-type:jwt-bearer":
+                authorized = form.get("assertion", [""])[0].count(".") == 2
+            else:
+                return self._send(400, {"error": "unsupported_grant_type", "error_description": "grant type not supported"})
+            if not authorized:
+                return self._send(400, {"error": "invalid_grant", "error_description": "authentication failure"})
+            return self._send(200, {
+                "access_token": self.mock.new_session(),
+                "instance_url": self.mock.url,
+                "token_type": "Bearer",
+                "issued_at": str(int(time.time() * 1000))
+            })
+
+        self._send(404, [{"errorCode": "NOT_FOUND", "message": "The requested resource does not exist"}])
+
+    def do_GET(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        self._simulate_latency()
+        if not self._authorized():
+            return
+        self.mock.count_request()
+        if self._inject_error():
+            return
+
+        if parsed.path == f"{API_PREFIX}/limits":
+            return self._send(200, {
+                "DailyApiRequests": {"Max": self.mock.api_limit, "Remaining": self.mock.api_limit - self.mock.api_used}
+            })
+
+        if parsed.path == f"{API_PREFIX}/query" and "explain" in urllib.parse.parse_qs(parsed.query):
+            return self._send(200, {"plans": [self.mock.plan]})
+
+        if parsed.path in (f"{API_PREFIX}/query", f"{API_PREFIX}/queryAll"):
+            soql_query = urllib.parse.parse_qs(parsed.query).get("q", [""])[0]
+            low, high = 0, self.mock.total_records
+            for operator, record_id in _ID_FILTER_PATTERN.findall(soql_query):
+                if operator == ">=":
+                    low = max(low, self.mock.index_of(record_id))
+                else:
+                    high = min(high, self.mock.index_of(record_id))
+            modstamp_match = _MODSTAMP_FILTER_PATTERN.search(soql_query)
+            if modstamp_match:
+                since = datetime.strptime(modstamp_match.group(1), "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+                low = max(low, int((since - _MODSTAMP_EPOCH).total_seconds()))
+            high = max(low, high)
+            limit_match = _LIMIT_PATTERN.search(soql_query)
+            if limit_match:
+                high = min(high, low + int(limit_match.group(1)))
+            flags = ("i" if _ID_ONLY_PATTERN.search(soql_query) else "") + (
+                "d" if _DESCENDING_PATTERN.search(soql_query) else "")
+            return self._send_page(0, low, high, flags)
+
+        if parsed.path == f"{API_PREFIX}/sobjects/" or parsed.path.endswith("/describe/"):
+            if self.headers.get("If-Modified-Since") == self.mock.schema_modified:
+                return self._send(304, b"")
+            sobject = parsed.path.split("/")[-3] if parsed.path.endswith("/describe/") else None
+            if sobject and sobject not in _SCHEMA:
+                return self._send(404, [{"errorCode": "NOT_FOUND", "message": "The requested resource does not exist"}])
+            body = _SCHEMA[sobject] if sobject else {"sobjects": [
+                {"name": name, "label": name, "keyPrefix": describe["keyPrefix"], "custom": False, "queryable": True}
+                for name, describe in _SCHEMA.items()]}
+            return self._send(200, body, headers={"Last-Modified": self.mock.schema_modified})
+
+        if parsed.path.startswith(f"{API_PREFIX}/sobjects/") and parsed.path.endswith("/deleted/"):
+            return self._send(200, {
+                "deletedRecords": self.mock.deleted_records,
+                "earliestDateAvailable": "2025-01-01T00:00:00.000+0000",
+                "latestDateCovered": urllib.parse.parse_qs(parsed.query)["end"][0].replace("+00:00", ".000+0000")
+            })
+
+        if parsed.path.startswith(f"{API_PREFIX}/query/"):
+            _, position, low, high, flags = parsed.path.rsplit("/", 1)[1].split("-")
+            return self._send_page(int(position), int(low), int(high), flags)
+
+        self._send(404, [{"errorCode": "NOT_FOUND", "message": "The requested resource does not exist"}])
+
+    def _send_page(self, position: int, low: int, high: int, flags: str) -> None:
+        batch_size = 2000
+        options = self.headers.get("Sforce-Query-Options", "")
+        if options.startswith("batchSize="):
+            batch_size = int(options.split("=", 1)[1])
+
+        total = high - low
+        end = min(total, position + batch_size)
+        indexes = range(high - 1 - position, high - 1 - end, -1) if "d" in flags else range(low + position, low + end)
+        page = {
+            "totalSize": total,
+            "done": end >= total,
+            "records": [MockSalesforceServer.record(index, id_only="i" in flags) for index in indexes]
+        }
+        if end < total:
+            page["nextRecordsUrl"] = f"{API_PREFIX}/query/01gMOCK-{end}-{low}-{high}-{flags}"
+        self._send(200, page)
+
+
+def _soap_login_response(instance_url: str, session_id: str, session_seconds: int) -> str:
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns="urn:partner.soap.sforce.com">
+  <soapenv:Body>
+    <loginResponse>
+      <result>
+        <serverUrl>{instance_url}/services/Soap/u/63.0/00DMOCK</serverUrl>
+        <sessionId>{session_id}</sessionId>
+        <userId>005MOCK000000001</userId>
+        <userInfo>
+          <organizationId>00DMOCK000000001</organizationId>
+          <sessionSecondsValid>{session_seconds}</sessionSecondsValid>
+        </userInfo>
+      </result>
+    </loginResponse>
+  </soapenv:Body>
+</soapenv:Envelope>"""
+
+
+def _soap_fault(fault_code: str, message: str) -> str:
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
+  <soapenv:Body>
+    <soapenv:Fault>
+      <faultcode>sf:{fault_code}</faultcode>
+      <faultstring>{fault_code}: {message}</faultstring>
+    </soapenv:Fault>
+  </soapenv:Body>
+</soapenv:Envelope>"""
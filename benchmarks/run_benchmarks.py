@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import statistics
+import subprocess
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_salesforce import MockSalesforceServer
+from provider.salesforce import SalesforceProvider
+from tools.soql_query import SoqlQueryTool
+from utils.query_cache import query_cache
+from utils.session_cache import session_cache
+from utils.session_manager import SalesforceSessionManager
+from utils.validation_cache import validation_cache
+
+USERNAME = "benchmark@example.com"
+PASSWORD_WITH_TOKEN = "passwordTOKEN"
+
+
+class InMemoryStorage:
+    def __init__(self):
+        self._data: dict[str, bytes] = {}
+
+    def get(self, key: str) -> bytes:
+        return self._data.get(key)
+
+    def set(self, key: str, val: bytes) -> None:
+        self._data[key] = val
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def exist(self, key: str) -> bool:
+        return key in self._data
+
+
+AUTH_METHOD = "password"
+
+
+def _credentials(server: MockSalesforceServer) -> dict[str, str]:
+    if AUTH_METHOD == "oauth_client_credentials":
+        return {
+            "salesforce_auth_method": AUTH_METHOD,
+            "salesforce_login_url": server.url,
+            "salesforce_client_id": "3MVG9BENCHMARK",
+            "salesforce_client_secret": "benchmark-secret"
+        }
+    return {
+        "salesforce_login_url": server.url,
+        "salesforce_username": USERNAME,
+        "salesforce_password_with_security_token": PASSWORD_WITH_TOKEN
+    }
+
+
+def _make_tool(server: MockSalesforceServer, storage: InMemoryStorage) -> SoqlQueryTool:
+    tool = SoqlQueryTool.__new__(SoqlQueryTool)
+    tool.runtime = SimpleNamespace(credentials=_credentials(server))
+    tool.session = SimpleNamespace(storage=storage)
+    return tool
+
+
+def _reset_caches() -> None:
+    session_cache.clear()
+    query_cache.clear()
+    validation_cache.clear()
+
+
+def scenario_query(server: MockSalesforceServer, storage: InMemoryStorage,
+                   parameters: dict) -> Callable[[], None]:
+    tool = _make_tool(server, storage)
+
+    def run() -> None:
+        for _ in tool._invoke(dict(parameters)):
+            pass
+
+    return run
+
+
+def scenario_session(server: MockSalesforceServer, storage: InMemoryStorage,
+                     parameters: dict) -> Callable[[], None]:
+    def run() -> None:
+        SalesforceSessionManager.from_credentials(_credentials(server), storage).get_valid_session()
+
+    return run
+
+
+def scenario_validate(server: MockSalesforceServer, storage: InMemoryStorage,
+                      parameters: dict) -> Callable[[], None]:
+    provider = SalesforceProvider.__new__(SalesforceProvider)
+    credentials = _credentials(server)
+
+    def run() -> None:
+        validation_cache.clear()
+        provider._validate_credentials(credentials)
+
+    return run
+
+
+def scenario_validate_warm(server: MockSalesforceServer, storage: InMemoryStorage,
+                           parameters: dict) -> Callable[[], None]:
+    provider = SalesforceProvider.__new__(SalesforceProvider)
+    credentials = _credentials(server)
+
+    def run() -> None:
+        provider._validate_credentials(credentials)
+
+    return run
+
+
+SCENARIOS = {
+    "query": scenario_query,
+    "session": scenario_session,
+    "validate": scenario_validate,
+    "validate_warm": scenario_validate_warm
+}
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(samples: list[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_case(scenario: str, records: int, concurrency: int, iterations: int, args: argparse.Namespace) -> dict:
+    server = MockSalesforceServer(total_records=records, latency_ms=args.latency_ms,
+                                  error_rate=args.error_rate).start()
+    try:
+        _reset_caches()
+        storage = InMemoryStorage()
+        parameters = {
+            "soql_query": "SELECT Id, Name, Amount, StageName, IsClosed, CloseDate, Account.Name FROM Opportunity",
+            "mode": args.mode,
+            "output_format": args.output_format,
+            "record_format": args.record_format
+        }
+        operation = SCENARIOS[scenario](server, storage, parameters)
+
+        for _ in range(args.warmup):
+            operation()
+        logins_before = server.logins
+
+        def timed_operation(_) -> float:
+            started = time.perf_counter()
+            operation()
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed_operation, range(iterations)))
+        elapsed = time.perf_counter() - started
+
+        return {
+            "scenario": scenario,
+            "records": records,
+            "concurrency": concurrency,
+            "iterations": iterations,
+            "throughput_ops": round(iterations / elapsed, 2),
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "logins": server.logins - logins_before,
+            "server_requests": server.requests
+        }
+    finally:
+        server.stop()
+
+
+def run_case_isolated(scenario: str, records: int, concurrency: int, iterations: int) -> dict:
+    # ru_maxrss is a process-lifetime peak, so each case runs in its own interpreter to report its own peak.
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *sys.argv[1:],
+         "--case", f"{scenario}:{records}:{concurrency}:{iterations}"],
+        capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark case {scenario}/{records}/{concurrency} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local mock Salesforce server.")
+    parser.add_argument("--scenarios", default="query,session,validate",
+                        help="Comma-separated scenarios: " + ", ".join(SCENARIOS))
+    parser.add_argument("--records", type=_int_list, default=[100, 2000, 10000],
+                        help="Comma-separated result sizes for the query scenario")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8],
+                        help="Comma-separated numbers of concurrent callers")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed operations per case")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed operations before each case")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated server latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API requests answered with 503")
+    parser.add_argument("--mode", default="rest", choices=["rest", "parallel"], help="Query tool mode parameter")
+    parser.add_argument("--output-format", default="json", help="Query tool output_format parameter")
+    parser.add_argument("--record-format", default="raw", help="Query tool record_format parameter")
+    parser.add_argument("--auth-method", default="password", choices=["password", "oauth_client_credentials"],
+                        help="Login flow used by every scenario")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    global AUTH_METHOD
+    AUTH_METHOD = args.auth_method
+
+    if args.case:
+        scenario, records, concurrency, iterations = args.case.split(":")
+        print(json.dumps(run_case(scenario, int(records), int(concurrency), int(iterations), args)))
+        return
+
+    results = []
+    for scenario in [item.strip() for item in args.scenarios.split(",") if item.strip()]:
+        if scenario not in SCENARIOS:
+            parser.error(f"Unknown scenario '{scenario}'")
+        for records in args.records if scenario == "query" else [0]:
+            for concurrency in args.concurrency:
+                iterations = args.iterations if scenario != "query" else max(1, args.iterations // max(1, records // 2000))
+                result = run_case_isolated(scenario, records, concurrency, iterations)
+                results.append(result)
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    print(f"{result['scenario']:<9} records={result['records']:<7} "
+                          f"concurrency={result['concurrency']:<3} ops/s={result['throughput_ops']:<9} "
+                          f"p50={result['p50_ms']:<8}ms p99={result['p99_ms']:<8}ms "
+                          f"peak_rss={result['peak_rss_mb']}MB logins={result['logins']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,66 +4,84 @@ from typing import Any
 from dify_plugin import ToolProvider
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
 from dify_plugin.config.logger_format import plugin_logger_handler
-from utils.session_manager import SalesforceSessionManager
+from utils.http_client import API_VERSION, get_http_client, get_timeout
+from utils.metrics import increment, start_invocation, finish_invocation
+from utils.retry_policy import api_usage
+from utils.session_manager import (SalesforceSessionManager, AUTH_METHOD_PASSWORD, CREDENTIAL_LABELS,
+                                   get_auth_method, get_missing_credentials)
+from utils.validation_cache import credential_fingerprint, validation_cache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 logger.addHandler(plugin_logger_handler)
 
 
+class _ValidationStorage:
+    def get(self, key: str) -> bytes:
+        return None
+
+    def set(self, key: str, val: bytes) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+
 class SalesforceProvider(ToolProvider):
     def _validate_credentials(self, credentials: dict[str, Any]) -> None:
+        metrics = start_invocation("validate_credentials")
+        try:
+            self._validate(credentials)
+        finally:
+            finish_invocation(metrics)
+
+    def _validate(self, credentials: dict[str, Any]) -> None:
         logger.info("Starting Salesforce credential validation")
 
-        login_url = credentials.get("salesforce_login_url")
-        username = credentials.get("salesforce_username")
-        password_with_token = credentials.get("salesforce_password_with_security_token")
-
-        if not login_url:
-            logger.error("Salesforce Login URL is empty")
-            raise ToolProviderCredentialValidationError("Salesforce Login URL cannot be empty.")
-        if not username:
-            logger.error("Salesforce Username is empty")
-            raise ToolProviderCredentialValidationError("Salesforce Username cannot be empty.")
-        if not password_with_token:
-            logger.error("Salesforce Password + Security Token is empty")
-            raise ToolProviderCredentialValidationError("Salesforce Password + Security Token cannot be empty.")
-
-        login_url = login_url.strip().rstrip('/')
+        try:
+            auth_method = get_auth_method(credentials)
+            missing = get_missing_credentials(credentials)
+        except Exception as e:
+            logger.error(str(e))
+            raise ToolProviderCredentialValidationError(str(e))
+
+        if missing:
+            label = CREDENTIAL_LABELS[missing[0]]
+            logger.error(f"{label} is empty")
+            raise ToolProviderCredentialValidationError(f"{label} cannot be empty.")
+
+        login_url = credentials["salesforce_login_url"].strip().rstrip('/')
+        principal = credentials.get("salesforce_username") or credentials.get("salesforce_client_id")
         if not login_url.startswith(('http://', 'https://')):
             logger.error(f"Invalid login URL format: {login_url}")
             raise ToolProviderCredentialValidationError("Salesforce Login URL must start with http:// or https://")
 
         try:
-            logger.info(f"Validating credentials for user: {username[:3]}***")
-            logger.info(f"Login URL: {login_url}")
-            logger.info(f"Password length: {len(password_with_token)} characters")
-
-            logger.info("Creating temporary session manager for credential validation")
+            logger.info("Validating %s credentials for %s*** at %s", auth_method, principal[:3], login_url)
 
-            class MockStorage:
-                def get(self, key: str) -> bytes:
-                    return None
+            fingerprint = credential_fingerprint(credentials)
+            if validation_cache.is_valid(fingerprint):
+                logger.info("Credentials were validated recently, skipping Salesforce round trip")
+                increment("validation_cache_hits")
+                return
 
-                def set(self, key: str, val: bytes) -> None:
-                    pass
+            # Providers have no plugin storage; the session is shared with tools through the process session cache.
+            session_manager = SalesforceSessionManager.from_credentials(credentials, _ValidationStorage())
 
-                def delete(self, key: str) -> None:
-                    pass
+            logger.info("Logging in to validate credentials")
 
-            session_manager = SalesforceSessionManager(username, password_with_token, login_url, MockStorage())
-
-            logger.info("Attempting to get session for credential validation")
-
-            session_id, instance_url = session_manager.get_valid_session()
+            # Always log in with the submitted credentials: a session cached or being obtained for this user may
+            # come from a previous password or key.
+            session_id, instance_url = session_manager.login()
 
             if not session_id or not instance_url:
                 logger.error("Failed to obtain session from Salesforce")
                 raise ToolProviderCredentialValidationError(
-                    "Failed to obtain session from Salesforce. Check your username, password, and security token.")
+                    "Failed to obtain session from Salesforce. Check your username, password, and security token."
+                    if auth_method == AUTH_METHOD_PASSWORD else
+                    "Failed to obtain session from Salesforce. Check your connected app settings.")
 
-            logger.info(f"Session obtained successfully. Instance URL: {instance_url}")
-            logger.info(f"Session ID length: {len(session_id)} characters")
+            logger.info("Session obtained successfully. Instance URL: %s", instance_url)
 
             headers = {
                 "Authorization": f"Bearer {session_id}",
@@ -72,13 +90,13 @@ class SalesforceProvider(ToolProvider):
 
             logger.info("Testing session with Salesforce API")
 
-            response = requests.get(
-                f"{instance_url}/services/data/v63.0/limits",
+            response = get_http_client(instance_url).get(
+                f"{instance_url}/services/data/{API_VERSION}/limits",
                 headers=headers,
-                timeout=10
+                timeout=get_timeout(10)
             )
 
-            logger.info(f"API test response status: {response.status_code}")
+            logger.info("API test response status: %d", response.status_code)
 
             if response.status_code == 401:
                 logger.error(f"Session validation failed (401 Unauthorized)")
@@ -90,6 +108,13 @@ class SalesforceProvider(ToolProvider):
                 raise ToolProviderCredentialValidationError(
                     f"Salesforce API validation failed with status {response.status_code}. Response: {response.text[:200]}")
 
+            if response.status_code == 200:
+                daily_requests = response.json().get("DailyApiRequests") or {}
+                if daily_requests.get("Max"):
+                    api_usage.record(instance_url, daily_requests["Max"] - daily_requests.get("Remaining", 0),
+                                     daily_requests["Max"])
+
+            validation_cache.put(fingerprint)
             logger.info("Salesforce credential validation successful!")
 
         except ToolProviderCredentialValidationError:
@@ -0,0 +1,60 @@
+import requests
+import logging
+from collections.abc import Generator
+from typing import Any
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.metrics import start_invocation, finish_invocation
+from utils.schema_cache import SchemaRegistry, suggest
+from utils.session_manager import SalesforceSessionManager
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+
+def _matches(search: str, *values: Any) -> bool:
+    return not search or any(search in str(value or "").lower() for value in values)
+
+
+class SObjectDescribeTool(Tool):
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        metrics = start_invocation("sobject_describe")
+        try:
+            yield from self._describe(tool_parameters)
+        finally:
+            finish_invocation(metrics)
+
+    def _describe(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        sobject_name = (tool_parameters.get("sobject_name") or "").strip()
+        search = (tool_parameters.get("search") or "").strip().lower()
+
+        session_manager = SalesforceSessionManager.from_credentials(self.runtime.credentials, self.session.storage)
+        registry = SchemaRegistry(session_manager)
+
+        try:
+            if not sobject_name:
+                logger.info("Listing queryable Salesforce objects")
+                sobjects = [sobject for sobject in registry.list_sobjects()
+                            if sobject.get("queryable") and _matches(search, sobject["name"], sobject["label"])]
+                yield self.create_text_message(f"Found {len(sobjects)} queryable object(s).")
+                yield self.create_json_message({"sobjects": sobjects})
+                return
+
+            logger.info(f"Describing Salesforce object {sobject_name}")
+            describe = registry.describe(sobject_name)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Network error while describing Salesforce objects: {str(e)}")
+            raise Exception(f"Network error while describing Salesforce objects: {str(e)}")
+
+        if describe is None:
+            raise Exception(f"sObject type '{sobject_name}' is not supported."
+                            + suggest(sobject_name, [sobject["name"] for sobject in registry.list_sobjects()]))
+
+        fields = [field for field in describe["fields"] if _matches(search, field["name"], field["label"])]
+        summary = f"{describe['name']} ({describe['label']}) has {len(describe['fields'])} field(s)"
+        if search:
+            summary += f", {len(fields)} matching '{search}'"
+        yield self.create_text_message(summary + ".")
+        yield self.create_json_message(dict(describe, fields=fields))
@@ -0,0 +1,84 @@
+import json
+import requests
+import logging
+from collections.abc import Generator
+from typing import Any
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.composite_query import CompositeQueryRunner, MAX_RECORDS_PER_QUERY
+from utils.metrics import start_invocation, finish_invocation
+from utils.session_manager import SalesforceSessionManager
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+MAX_QUERIES = 100
+
+
+def parse_queries(raw_queries: str) -> list[str]:
+    raw_queries = raw_queries.strip()
+    if raw_queries.startswith("["):
+        try:
+            queries = json.loads(raw_queries)
+        except json.JSONDecodeError as e:
+            raise Exception(f"SOQL queries must be a JSON array of strings: {e}")
+        if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+            raise Exception("SOQL queries must be a JSON array of strings.")
+    else:
+        queries = raw_queries.splitlines()
+
+    return [query.strip().rstrip(';').strip() for query in queries if query.strip()]
+
+
+class SoqlBatchQueryTool(Tool):
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        metrics = start_invocation("soql_batch_query")
+        try:
+            yield from self._run_queries(tool_parameters)
+        finally:
+            finish_invocation(metrics)
+
+    def _run_queries(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        logger.info("Starting Salesforce batch SOQL query execution")
+
+        queries = parse_queries(tool_parameters.get("soql_queries", ""))
+
+        if not queries:
+            logger.error("No SOQL queries provided")
+            raise Exception("SOQL queries cannot be empty.")
+
+        if len(queries) > MAX_QUERIES:
+            logger.error(f"Too many SOQL queries: {len(queries)}")
+            raise Exception(f"Too many SOQL queries. At most {MAX_QUERIES} queries can be run in one batch.")
+
+        for query in queries:
+            if not query.upper().startswith("SELECT"):
+                logger.error(f"Invalid SOQL query syntax: {query[:50]}")
+                raise Exception(f"Invalid SOQL query. Query must start with SELECT: {query[:100]}")
+
+        session_manager = SalesforceSessionManager.from_credentials(self.runtime.credentials, self.session.storage)
+        max_records = tool_parameters.get("max_records_per_query")
+        runner = CompositeQueryRunner(session_manager,
+                                      max_records_per_query=int(max_records) if max_records else MAX_RECORDS_PER_QUERY)
+
+        try:
+            results = runner.run(queries)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Network error while querying Salesforce: {str(e)}")
+            raise Exception(f"Network error while querying Salesforce: {str(e)}")
+
+        for index, result in enumerate(results):
+            result["index"] = index
+
+        failed = sum(1 for result in results if not result["success"])
+        summary = f"Executed {len(results)} queries: {len(results) - failed} succeeded, {failed} failed."
+        logger.info(summary)
+
+        yield self.create_text_message(summary)
+        yield self.create_json_message({
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "results": results
+        })
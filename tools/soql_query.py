@@ -1,12 +1,21 @@
 import requests
 import logging
-import urllib.parse
 from collections.abc import Generator
-from typing import Any
+from typing import Any, Optional
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.config.logger_format import plugin_logger_handler
 from utils.session_manager import SalesforceSessionManager
+from utils.bulk_query import BulkQueryJob
+from utils.delta_sync import DeltaSync
+from utils.metrics import timed, increment, start_invocation, finish_invocation
+from utils.output_formatter import OUTPUT_FORMATS, BatchFormatter
+from utils.pk_chunking import PkChunkedQuery
+from utils.query_cache import query_cache, MAX_ENTRY_FRACTION
+from utils.query_plan import PLAN_GUARD_MODES, QueryPlanGuard
+from utils.record_stream import RECORD_FORMATS, get_record_transform
+from utils.schema_cache import SchemaRegistry
+from utils.soql_pager import SoqlPager
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -14,24 +23,89 @@ logger.addHandler(plugin_logger_handler)
 
 
 class SoqlQueryTool(Tool):
-    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        logger.info("Starting Salesforce SOQL query execution")
+    def _emit_batches(self, batches: list[dict[str, Any]], soql_query: str, formatter: Optional[BatchFormatter],
+                      cached: bool = False) -> Generator[ToolInvokeMessage, None, None]:
+        for batch in batches:
+            if batch["batch"] == 1:
+                if batch["totalSize"] > 0:
+                    summary = f"Query executed successfully. Found {batch['totalSize']} record(s)."
+                    logger.info("SOQL query succeeded, %d matching record(s)", batch["totalSize"])
+                else:
+                    summary = "Query executed successfully. No records found."
+                    logger.info("SOQL query succeeded, no records found")
+                yield self.create_text_message(summary)
+
+            if formatter is None:
+                with timed("emit"):
+                    message = self.create_json_message(dict(batch, query=soql_query, cached=cached))
+            elif formatter.output_format == "columnar":
+                columnar_batch = {key: value for key, value in batch.items() if key != "records"}
+                with timed("format"):
+                    columnar_batch.update(formatter.format(batch["records"]))
+                with timed("emit"):
+                    message = self.create_json_message(dict(columnar_batch, query=soql_query, cached=cached))
+            elif batch["records"]:
+                with timed("format"):
+                    text = formatter.format(batch["records"])
+                with timed("emit"):
+                    message = self.create_text_message(text)
+            else:
+                continue
+            yield message
+
+    def _invoke_bulk(self, session_manager: SalesforceSessionManager, soql_query: str,
+                     query_all: bool) -> Generator[ToolInvokeMessage, None, None]:
+        job = BulkQueryJob(session_manager, soql_query, query_all=query_all)
 
         try:
-            login_url = self.runtime.credentials["salesforce_login_url"]
-            username = self.runtime.credentials["salesforce_username"]
-            password_with_token = self.runtime.credentials["salesforce_password_with_security_token"]
-            logger.info(f"Initializing Salesforce tool for user: {username[:3]}***")
-        except KeyError as e:
-            missing_key = str(e).strip("'")
-            logger.error(f"Missing Salesforce credential: {missing_key}")
-            raise Exception(
-                f"Salesforce credential '{missing_key}' is not configured. Please provide it in the plugin settings.")
-
-        session_manager = SalesforceSessionManager(username, password_with_token, login_url, self.session.storage)
+            job.create()
+            job.wait_for_completion()
+
+            yield self.create_text_message(
+                f"Bulk query executed successfully. Found {job.number_records_processed} record(s).")
+
+            part = 0
+            for page, record_count in job.iter_result_pages():
+                part += 1
+                yield self.create_blob_message(page, meta={
+                    "mime_type": "text/csv",
+                    "filename": f"{job.job_id}_part{part}.csv",
+                    "records": record_count
+                })
+
+            logger.info(f"Bulk query job {job.job_id} exported in {part} file(s)")
+            yield self.create_json_message({
+                "totalSize": job.number_records_processed,
+                "done": True,
+                "jobId": job.job_id,
+                "parts": part,
+                "query": soql_query
+            })
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Network error while running Salesforce bulk query: {str(e)}")
+            raise Exception(f"Network error while running Salesforce bulk query: {str(e)}")
+
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        include_stats = bool(tool_parameters.get("include_stats", False))
+        metrics = start_invocation("soql_query", force=include_stats)
+        try:
+            yield from self._run_query(tool_parameters)
+        finally:
+            stats = finish_invocation(metrics)
+
+        if include_stats:
+            yield self.create_json_message({"stats": dict(stats, result_cache=query_cache.stats())})
+
+    def _run_query(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        logger.debug("Starting Salesforce SOQL query execution")
+
+        with timed("credentials"):
+            session_manager = SalesforceSessionManager.from_credentials(self.runtime.credentials,
+                                                                        self.session.storage)
 
         soql_query = tool_parameters.get("soql_query", "").strip()
-        logger.info(f"SOQL query to execute: {soql_query[:100]}{'...' if len(soql_query) > 100 else ''}")
+        logger.info("SOQL query to execute: %.100s%s", soql_query, "..." if len(soql_query) > 100 else "")
 
         if not soql_query:
             logger.error("SOQL query is empty")
@@ -41,64 +115,112 @@ class SoqlQueryTool(Tool):
             logger.error(f"Invalid SOQL query syntax: {soql_query[:50]}")
             raise Exception("Invalid SOQL query. Query must start with SELECT.")
 
-        def make_api_call(session_id: str, instance_url: str) -> requests.Response:
-            headers = {
-                "Authorization": f"Bearer {session_id}",
-                "Content-Type": "application/json"
-            }
-
-            encoded_query = urllib.parse.quote(soql_query)
-            url = f"{instance_url}/services/data/v63.0/query?q={encoded_query}"
-            logger.info(f"Making Salesforce API call to: {instance_url}/services/data/v63.0/query")
-            return requests.get(url, headers=headers, timeout=30)
+        query_all = bool(tool_parameters.get("query_all", False))
+        if tool_parameters.get("mode") == "bulk":
+            yield from self._invoke_bulk(session_manager, soql_query, query_all)
+            return
+
+        batch_size = tool_parameters.get("batch_size")
+        max_records = tool_parameters.get("max_records")
+        cache_ttl = float(tool_parameters.get("cache_ttl") or 0)
+        record_format = tool_parameters.get("record_format") or "raw"
+        if record_format not in RECORD_FORMATS:
+            logger.error(f"Invalid record format: {record_format}")
+            raise Exception(f"Invalid record format '{record_format}'. Must be one of: {', '.join(RECORD_FORMATS)}.")
+        output_format = tool_parameters.get("output_format") or "json"
+        if output_format not in OUTPUT_FORMATS:
+            logger.error(f"Invalid output format: {output_format}")
+            raise Exception(f"Invalid output format '{output_format}'. Must be one of: {', '.join(OUTPUT_FORMATS)}.")
+        formatter = BatchFormatter(output_format, soql_query) if output_format != "json" else None
+        plan_guard = tool_parameters.get("plan_guard") or "off"
+        if plan_guard not in PLAN_GUARD_MODES:
+            logger.error(f"Invalid plan guard: {plan_guard}")
+            raise Exception(f"Invalid plan guard '{plan_guard}'. Must be one of: {', '.join(PLAN_GUARD_MODES)}.")
+
+        if tool_parameters.get("validate_schema"):
+            try:
+                SchemaRegistry(session_manager).validate_query(soql_query)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Schema validation unavailable, running query unchecked: {e}")
+            except Exception as e:
+                # Describe API failures leave the query unchecked; schema mismatches and login failures stop it.
+                if "Salesforce API error" not in str(e):
+                    raise
+                logger.warning(f"Schema validation unavailable, running query unchecked: {e}")
+
+        delta = None
+        if tool_parameters.get("mode") == "delta":
+            delta = DeltaSync(session_manager, soql_query)
+            soql_query = delta.rewrite()
+            cache_ttl = 0
+
+        cache_key = None
+        if cache_ttl > 0:
+            cache_key = query_cache.make_key(session_manager.login_url, session_manager.principal, soql_query,
+                                             batch_size, max_records, query_all, record_format, plan_guard)
+            cached_batches = query_cache.get(cache_key)
+            if cached_batches is not None:
+                logger.info("Serving SOQL query from result cache (%s)", query_cache.stats())
+                increment("result_cache_hits")
+                yield from self._emit_batches(cached_batches, soql_query, formatter, cached=True)
+                return
+            increment("result_cache_misses")
+            cache_ttl = query_cache.effective_ttl(soql_query, cache_ttl)
 
         try:
-            session_id, instance_url = session_manager.get_valid_session()
-            logger.info("Executing SOQL query with Salesforce API")
-            response = make_api_call(session_id, instance_url)
-
-            logger.info(f"Salesforce API response status: {response.status_code}")
-
-            if 400 <= response.status_code < 500:
-                logger.warning(f"Received {response.status_code} response, attempting session refresh")
-                session_id, instance_url = session_manager.refresh_session()
-                response = make_api_call(session_id, instance_url)
-                logger.info(f"Retry response status: {response.status_code}")
-
-            if response.status_code == 401:
-                logger.error("Unauthorized: Invalid or expired session")
-                raise Exception("Unauthorized: Invalid or expired session. Please check your credentials.")
-            elif response.status_code == 400:
-                logger.error(f"Bad request (400): {response.text[:200]}")
-                try:
-                    error_data = response.json()
-                    error_message = error_data.get('message', 'Bad Request')
-                    raise Exception(f"Invalid SOQL query: {error_message}")
-                except:
-                    raise Exception(f"Invalid SOQL query: {response.text}")
-            elif response.status_code != 200:
-                logger.error(f"Salesforce API error (status {response.status_code}): {response.text[:200]}")
-                raise Exception(f"Salesforce API error (status {response.status_code}): {response.text}")
-
-            logger.info("Parsing Salesforce API response")
-            result_data = response.json()
-
-            formatted_result = {
-                "totalSize": result_data.get("totalSize", 0),
-                "done": result_data.get("done", True),
-                "records": result_data.get("records", []),
-                "query": soql_query
-            }
-
-            if formatted_result["totalSize"] > 0:
-                summary = f"Query executed successfully. Found {formatted_result['totalSize']} record(s)."
-                logger.info(f"SOQL query completed successfully, found {formatted_result['totalSize']} records")
-            else:
-                summary = "Query executed successfully. No records found."
-                logger.info("SOQL query completed successfully, no records found")
-
-            yield self.create_text_message(summary)
-            yield self.create_json_message(formatted_result)
+            if plan_guard != "off":
+                soql_query = QueryPlanGuard(session_manager, mode=plan_guard).check(soql_query)
+
+            logger.debug("Executing SOQL query with Salesforce API")
+
+            pager = None
+            if tool_parameters.get("mode") == "parallel":
+                if max_records:
+                    logger.info("Parallel extraction unavailable with max_records, running serially")
+                else:
+                    pager = PkChunkedQuery(session_manager, soql_query, batch_size=batch_size, query_all=query_all,
+                                           record_transform=get_record_transform(record_format))
+                    if not pager.plan():
+                        pager = None
+            if pager is None:
+                pager = SoqlPager(session_manager, soql_query, batch_size=batch_size, max_records=max_records,
+                                  query_all=query_all, record_transform=get_record_transform(record_format))
+
+            cache_budget = query_cache.max_bytes * MAX_ENTRY_FRACTION
+            cacheable_batches = [] if cache_key else None
+            cacheable_size = 0
+
+            for batch in pager.iter_batches():
+                if delta:
+                    batch = delta.track(batch)
+                if cacheable_batches is not None:
+                    cacheable_size += query_cache.estimate_size([batch])
+                    if cacheable_size <= cache_budget:
+                        cacheable_batches.append(batch)
+                    else:
+                        cacheable_batches = None
+
+                yield from self._emit_batches([batch], soql_query, formatter)
+
+            logger.info("SOQL query completed, streamed %d record(s) in %d batch(es)",
+                        pager.records_returned, pager.batches_returned)
+
+            if cacheable_batches:
+                query_cache.put(cache_key, cacheable_batches, cache_ttl, cacheable_size)
+
+            if delta:
+                deleted = delta.fetch_deleted()
+                watermark = delta.commit(deleted.get("deletedThrough"))
+                logger.info("Delta sync found %d changed and %d deleted record(s)",
+                            delta.changed, len(deleted["deleted"]))
+                yield self.create_json_message({"delta": dict(
+                    deleted,
+                    initial=delta.watermark is None,
+                    changed=delta.changed,
+                    since=delta.watermark.get("ts") if delta.watermark else None,
+                    watermark={"ts": watermark["ts"], "id": watermark["id"]},
+                    deletedThrough=watermark["deleted_through"]
+                )})
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Network error while querying Salesforce: {str(e)}")
@@ -0,0 +1,184 @@
+import os
+import time
+import logging
+from collections.abc import Generator, Iterator
+from typing import Any, Optional
+import requests
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.http_client import API_VERSION, get_http_client, get_timeout
+from utils.metrics import timed, increment
+from utils.retry_policy import RetryPolicy, extract_error
+from utils.session_manager import SalesforceSessionManager
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+RESULT_PAGE_RECORDS = int(os.getenv("SALESFORCE_BULK_PAGE_RECORDS", "50000"))
+RESULT_PART_BYTES = int(os.getenv("SALESFORCE_BULK_PART_BYTES", str(16 * 1024 * 1024)))
+POLL_TIMEOUT_SECONDS = float(os.getenv("SALESFORCE_BULK_POLL_TIMEOUT", "100"))
+POLL_INITIAL_DELAY = 0.5
+POLL_MAX_DELAY = 10.0
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+def split_csv_parts(chunks: Iterator[bytes], max_bytes: int) -> Generator[tuple[bytes, int], None, None]:
+    header = None
+    pieces: list[bytes] = []
+    size = 0
+    records = 0
+    open_record = False
+    in_quotes = False
+    emitted = False
+
+    for chunk in chunks:
+        start = position = record_end = 0
+        while True:
+            newline = chunk.find(b"\n", position)
+            if newline == -1:
+                in_quotes ^= chunk.count(b'"', position) % 2 == 1
+                break
+            # Quoted fields may contain line breaks; only a newline outside quotes ends a record.
+            in_quotes ^= chunk.count(b'"', position, newline) % 2 == 1
+            position = newline + 1
+            if in_quotes:
+                continue
+
+            record_end = position
+            if header is None:
+                header = b"".join(pieces) + chunk[start:position]
+                pieces, size, start = [header], len(header), position
+                continue
+
+            records += 1
+            if size + position - start >= max_bytes:
+                pieces.append(chunk[start:position])
+                yield b"".join(pieces), records
+                emitted = True
+                pieces, size, records, start = [header], len(header), 0, position
+
+        if record_end < len(chunk):
+            open_record = True
+        elif record_end:
+            open_record = False
+        if start < len(chunk):
+            pieces.append(chunk[start:])
+            size += len(chunk) - start
+
+    if header is not None and open_record:
+        records += 1
+    if records or not emitted:
+        yield b"".join(pieces), records
+
+
+class BulkQueryJob:
+    def __init__(self, session_manager: SalesforceSessionManager, soql_query: str, query_all: bool = False,
+                 page_records: int = RESULT_PAGE_RECORDS, part_bytes: int = RESULT_PART_BYTES,
+                 retry_policy: Optional[RetryPolicy] = None):
+        self.session_manager = session_manager
+        self.soql_query = soql_query
+        self.query_all = query_all
+        self.page_records = page_records
+        self.part_bytes = part_bytes
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.job_id: Optional[str] = None
+        self.number_records_processed = 0
+
+    @staticmethod
+    def _headers(session_id: str, accept: str = "application/json") -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {session_id}",
+            "Content-Type": "application/json",
+            "Accept": accept
+        }
+
+    def _request(self, method: str, path: str, accept: str = "application/json", idempotent: bool = True,
+                 **kwargs) -> requests.Response:
+        def send(session_id: str, instance_url: str) -> requests.Response:
+            return get_http_client(instance_url).request(
+                method, f"{instance_url}{path}", headers=self._headers(session_id, accept),
+                timeout=get_timeout(), **kwargs)
+
+        response = self.retry_policy.execute(self.session_manager, send, idempotent=idempotent)
+        if response.status_code >= 300:
+            error_code, error_message = extract_error(response)
+            logger.error(f"Bulk API error (status {response.status_code}): {response.text[:200]}")
+            if response.status_code == 400:
+                raise Exception(f"Invalid SOQL query: {error_message}")
+            raise Exception(f"Salesforce API error (status {response.status_code}, {error_code}): {error_message}")
+        return response
+
+    def create(self) -> str:
+        logger.info("Creating Bulk API 2.0 query job")
+        # Not retried once the request may have been sent, so a lost response cannot create a second job.
+        response = self._request("POST", f"/services/data/{API_VERSION}/jobs/query", idempotent=False, json={
+            "operation": "queryAll" if self.query_all else "query",
+            "query": self.soql_query
+        })
+        self.job_id = response.json()["id"]
+        logger.info(f"Bulk query job {self.job_id} created")
+        return self.job_id
+
+    def wait_for_completion(self) -> dict[str, Any]:
+        deadline = time.time() + POLL_TIMEOUT_SECONDS
+        delay = POLL_INITIAL_DELAY
+
+        while True:
+            job = self._request("GET", f"/services/data/{API_VERSION}/jobs/query/{self.job_id}").json()
+            state = job.get("state")
+            logger.info(f"Bulk query job {self.job_id} state: {state}")
+
+            if state == "JobComplete":
+                self.number_records_processed = job.get("numberRecordsProcessed", 0)
+                return job
+            if state in ("Failed", "Aborted"):
+                raise Exception(f"Salesforce API error (bulk job {state}): {job.get('errorMessage', 'no details')}")
+            if time.time() + delay > deadline:
+                self.abort()
+                raise Exception(
+                    f"Salesforce API error (bulk job timeout): job {self.job_id} did not finish within "
+                    f"{POLL_TIMEOUT_SECONDS:g} seconds")
+
+            with timed("bulk_poll_wait"):
+                time.sleep(delay)
+            delay = min(POLL_MAX_DELAY, delay * 1.5)
+
+    def abort(self) -> None:
+        try:
+            self._request("PATCH", f"/services/data/{API_VERSION}/jobs/query/{self.job_id}",
+                          json={"state": "Aborted"})
+            logger.info(f"Bulk query job {self.job_id} aborted")
+        except Exception as e:
+            logger.warning(f"Failed to abort bulk query job {self.job_id}: {e}")
+
+    @staticmethod
+    def _timed_chunks(chunks: Iterator[bytes]) -> Generator[bytes, None, None]:
+        while True:
+            with timed("download"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            increment("bytes_received", len(chunk))
+            yield chunk
+
+    def iter_result_pages(self) -> Generator[tuple[bytes, int], None, None]:
+        locator = None
+
+        while True:
+            params = {"maxRecords": self.page_records}
+            if locator:
+                params["locator"] = locator
+
+            response = self._request("GET", f"/services/data/{API_VERSION}/jobs/query/{self.job_id}/results",
+                                     accept="text/csv", params=params, stream=True)
+            try:
+                chunks = response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES)
+                for part, record_count in split_csv_parts(self._timed_chunks(chunks), self.part_bytes):
+                    logger.info(f"Downloaded bulk result part with {record_count} record(s), {len(part)} bytes")
+                    yield part, record_count
+            finally:
+                response.close()
+
+            locator = response.headers.get("Sforce-Locator")
+            if not locator or locator == "null":
+                return
@@ -0,0 +1,189 @@
+import os
+import logging
+import contextvars
+import urllib.parse
+import requests
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.http_client import API_VERSION, get_http_client, get_timeout
+from utils.retry_policy import RetryPolicy, extract_error
+from utils.session_manager import SalesforceSessionManager
+from utils.soql_pager import SoqlPager
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+COMPOSITE_BATCH_LIMIT = 25
+MAX_WORKERS = int(os.getenv("SALESFORCE_BATCH_MAX_WORKERS", "4"))
+MAX_RECORDS_PER_QUERY = int(os.getenv("SALESFORCE_BATCH_MAX_RECORDS_PER_QUERY", "200"))
+
+
+class CompositeQueryRunner:
+    def __init__(self, session_manager: SalesforceSessionManager,
+                 max_records_per_query: Optional[int] = MAX_RECORDS_PER_QUERY,
+                 max_workers: int = MAX_WORKERS, retry_policy: Optional[RetryPolicy] = None):
+        self.session_manager = session_manager
+        self.max_records_per_query = max_records_per_query
+        self.max_workers = max(1, max_workers)
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    @staticmethod
+    def _success(soql_query: str, page: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "query": soql_query,
+            "success": True,
+            "totalSize": page.get("totalSize", 0),
+            "done": page.get("done", True),
+            "records": page.get("records", []),
+            "error": None
+        }
+
+    @staticmethod
+    def _failure(soql_query: str, error: str) -> dict[str, Any]:
+        return {
+            "query": soql_query,
+            "success": False,
+            "totalSize": 0,
+            "done": True,
+            "records": [],
+            "error": error
+        }
+
+    def _follow(self, soql_query: str, start_path: Optional[str] = None,
+                records: Optional[list] = None) -> dict[str, Any]:
+        max_records = self.max_records_per_query
+        if max_records and records:
+            max_records -= len(records)
+
+        pager = SoqlPager(self.session_manager, soql_query, max_records=max_records,
+                          retry_policy=self.retry_policy, start_path=start_path)
+        records = list(records or [])
+        done = True
+        for batch in pager.iter_batches():
+            records.extend(batch["records"])
+            done = batch["done"]
+
+        if self._has_enough({"records": records}) and pager.total_size > len(records):
+            done = False
+        return self._success(soql_query, {"totalSize": pager.total_size, "done": done, "records": records})
+
+    def _follow_safely(self, soql_query: str, start_path: Optional[str] = None,
+                       records: Optional[list] = None) -> dict[str, Any]:
+        try:
+            return self._follow(soql_query, start_path, records)
+        except Exception as e:
+            return self._failure(soql_query, str(e))
+
+    def _run_single(self, soql_query: str) -> dict[str, Any]:
+        return self._follow_safely(soql_query)
+
+    def _run_concurrently(self, function: Callable, calls: list[tuple]) -> list:
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(calls))) as executor:
+            # Each task runs in a copy of the caller's context so its timings count towards this invocation.
+            futures = [executor.submit(contextvars.copy_context().run, function, *args) for args in calls]
+            return [future.result() for future in futures]
+
+    def _run_individually(self, queries: list[str]) -> list[dict[str, Any]]:
+        return self._run_concurrently(self._run_single, [(soql_query,) for soql_query in queries])
+
+    def _run_composite_chunk(self, queries: list[str]) -> list[dict[str, Any]]:
+        body = {
+            "haltOnError": False,
+            "batchRequests": [
+                {"method": "GET", "url": f"{API_VERSION}/query?q={urllib.parse.quote(soql_query)}"}
+                for soql_query in queries
+            ]
+        }
+
+        sent_session_ids = []
+
+        def send(session_id: str, instance_url: str):
+            sent_session_ids.append(session_id)
+            return get_http_client(instance_url).post(
+                f"{instance_url}/services/data/{API_VERSION}/composite/batch",
+                headers={"Authorization": f"Bearer {session_id}", "Content-Type": "application/json"},
+                json=body, timeout=get_timeout())
+
+        # Login failures propagate: falling back per query would retry the login once per query and can lock the user.
+        try:
+            response = self.retry_policy.execute(self.session_manager, send)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Composite batch request failed ({e}), running queries individually")
+            return self._run_individually(queries)
+
+        if response.status_code == 401:
+            logger.error("Unauthorized: composite batch request rejected after refreshing the session")
+            raise Exception("Unauthorized: Invalid or expired session. Please check your credentials.")
+        if response.status_code != 200:
+            error_code, error_message = extract_error(response)
+            logger.warning(f"Composite batch request failed (status {response.status_code}, {error_code}), "
+                           f"running queries individually")
+            return self._run_individually(queries)
+
+        sub_results = response.json().get("results", [])
+        if len(sub_results) != len(queries):
+            logger.warning(f"Composite batch returned {len(sub_results)} result(s) for {len(queries)} queries")
+
+        results = []
+        follow_ups = {}
+        for index, soql_query in enumerate(queries):
+            if index >= len(sub_results):
+                results.append(self._failure(
+                    soql_query, "Salesforce API error: no result was returned for this query in the composite batch."))
+                continue
+
+            sub_result = sub_results[index]
+            status_code = sub_result.get("statusCode")
+            payload = sub_result.get("result")
+
+            if status_code == 200:
+                if payload.get("nextRecordsUrl") and not self._has_enough(payload):
+                    follow_ups[index] = (soql_query, payload["nextRecordsUrl"], payload["records"])
+                    results.append(None)
+                else:
+                    results.append(self._truncate(soql_query, payload))
+            elif status_code == 401:
+                follow_ups[index] = (soql_query, None, None)
+                results.append(None)
+            else:
+                if isinstance(payload, list) and payload:
+                    payload = payload[0]
+                message = payload.get("message", str(payload)) if isinstance(payload, dict) else str(payload)
+                if status_code == 400:
+                    message = f"Invalid SOQL query: {message}"
+                results.append(self._failure(soql_query, message))
+
+        if any(args[1] is None for args in follow_ups.values()):
+            # Refresh once here instead of letting every rejected sub-request log in on its own.
+            self.session_manager.refresh_session(sent_session_ids[-1])
+
+        if follow_ups:
+            followed = self._run_concurrently(self._follow_safely, list(follow_ups.values()))
+            for index, result in zip(follow_ups, followed):
+                results[index] = result
+
+        return results
+
+    def _has_enough(self, page: dict[str, Any]) -> bool:
+        return bool(self.max_records_per_query) and len(page.get("records", [])) >= self.max_records_per_query
+
+    def _truncate(self, soql_query: str, page: dict[str, Any]) -> dict[str, Any]:
+        result = self._success(soql_query, page)
+        if self.max_records_per_query and len(result["records"]) > self.max_records_per_query:
+            result["records"] = result["records"][:self.max_records_per_query]
+            result["done"] = False
+        return result
+
+    def run(self, queries: list[str]) -> list[dict[str, Any]]:
+        chunks = [queries[i:i + COMPOSITE_BATCH_LIMIT] for i in range(0, len(queries), COMPOSITE_BATCH_LIMIT)]
+        logger.info(f"Running {len(queries)} queries in {len(chunks)} composite batch request(s)")
+        self.session_manager.get_valid_session()
+
+        if len(chunks) == 1:
+            return self._run_composite_chunk(chunks[0])
+
+        chunk_results = self._run_concurrently(self._run_composite_chunk, [(chunk,) for chunk in chunks])
+        return [result for results in chunk_results for result in results]
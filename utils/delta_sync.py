@@ -0,0 +1,160 @@
+import json
+import hashlib
+import logging
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+import requests
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.http_client import API_VERSION, get_http_client, get_timeout
+from utils.metrics import timed, increment
+from utils.query_cache import normalize_soql
+from utils.retry_policy import RetryPolicy, extract_error
+from utils.session_manager import SalesforceSessionManager
+from utils.soql_parser import SoqlStatement
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+WATERMARK_FIELD = "SystemModstamp"
+MIN_DELETED_WINDOW_SECONDS = 60
+CLOCK_SKEW_SECONDS = 300
+
+
+def parse_salesforce_datetime(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f%z")
+
+
+def format_salesforce_datetime(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+
+
+class DeltaSync:
+    def __init__(self, session_manager: SalesforceSessionManager, soql_query: str,
+                 retry_policy: Optional[RetryPolicy] = None):
+        self.session_manager = session_manager
+        self.soql_query = soql_query
+        self.retry_policy = retry_policy or RetryPolicy()
+        query_digest = hashlib.sha256(
+            f"{session_manager.login_url.lower()}|{session_manager.principal}|{normalize_soql(soql_query)}"
+            .encode('utf-8')).hexdigest()[:32]
+        self.storage_key = f"salesforce_delta_{query_digest}"
+        self.sobject: Optional[str] = None
+        self.watermark: Optional[dict[str, str]] = None
+        self.last_seen: Optional[tuple[str, str]] = None
+        self.changed = 0
+        self.skipped = 0
+        self.started_at = datetime.now(timezone.utc)
+
+    def _load_watermark(self) -> Optional[dict[str, str]]:
+        try:
+            with timed("storage_get"):
+                record = self.session_manager.storage.get(self.storage_key)
+            return json.loads(record) if record else None
+        except Exception as e:
+            logger.warning(f"Error reading delta watermark, running a full sync: {e}")
+            return None
+
+    def rewrite(self) -> str:
+        statement = SoqlStatement.parse(self.soql_query)
+        if statement.is_aggregate:
+            raise Exception("Invalid SOQL query: delta mode does not support aggregate queries.")
+        for keyword in ("LIMIT", "OFFSET", "FOR"):
+            if statement.get(keyword):
+                raise Exception(f"Invalid SOQL query: delta mode does not support a {keyword} clause.")
+
+        self.sobject = statement.sobject
+        fields = statement.fields
+        selected = {field.lower() for field in fields}
+        fields += [field for field in ("Id", WATERMARK_FIELD) if field.lower() not in selected]
+        statement = statement.replace(select=", ".join(fields), order_by=f"{WATERMARK_FIELD}, Id")
+
+        self.watermark = self._load_watermark()
+        if self.watermark:
+            # SOQL datetime literals have second precision; rows at the boundary second are deduplicated in track().
+            since = parse_salesforce_datetime(self.watermark["ts"]).replace(microsecond=0)
+            statement = statement.and_where(
+                f"{WATERMARK_FIELD} >= {since.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}")
+            logger.info(f"Delta sync from watermark {self.watermark['ts']} / {self.watermark['id']}")
+        else:
+            logger.info("No delta watermark stored, running an initial full sync")
+
+        return statement.to_soql()
+
+    def track(self, batch: dict[str, Any]) -> dict[str, Any]:
+        boundary = None
+        if self.watermark:
+            boundary = (parse_salesforce_datetime(self.watermark["ts"]), self.watermark["id"])
+
+        records = []
+        for record in batch["records"]:
+            stamp, record_id = record.get(WATERMARK_FIELD), record.get("Id")
+            if not stamp or not record_id:
+                records.append(record)
+                continue
+            if boundary and (parse_salesforce_datetime(stamp), record_id) <= boundary:
+                self.skipped += 1
+                continue
+            records.append(record)
+            self.last_seen = (stamp, record_id)
+
+        self.changed += len(records)
+        # Already-synced rows sort first, so they are all skipped by the time totalSize is reported.
+        return dict(batch, records=records, totalSize=max(0, batch["totalSize"] - self.skipped))
+
+    def fetch_deleted(self) -> dict[str, Any]:
+        if not self.watermark or not self.watermark.get("deleted_through"):
+            return {"deleted": []}
+
+        start = parse_salesforce_datetime(self.watermark["deleted_through"])
+        if self.started_at - start < timedelta(seconds=MIN_DELETED_WINDOW_SECONDS):
+            return {"deleted": [], "deletedThrough": self.watermark["deleted_through"]}
+
+        path = (f"/services/data/{API_VERSION}/sobjects/{self.sobject}/deleted/?" + urllib.parse.urlencode({
+            "start": start.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+            "end": self.started_at.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+        }))
+
+        def send(session_id: str, instance_url: str) -> requests.Response:
+            return get_http_client(instance_url).get(
+                f"{instance_url}{path}", headers={"Authorization": f"Bearer {session_id}"}, timeout=get_timeout())
+
+        try:
+            with timed("get_deleted"):
+                response = self.retry_policy.execute(self.session_manager, send)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Failed to fetch deleted records: {e}")
+            return {"deleted": [], "deletedThrough": self.watermark["deleted_through"], "deletedError": str(e)}
+
+        if response.status_code != 200:
+            error_code, error_message = extract_error(response)
+            logger.warning(f"Deleted records unavailable for {self.sobject} ({error_code}): {error_message}")
+            # INVALID_REPLICATION_DATE means the window fell out of the 30-day retention; restart tracking from now.
+            deleted_through = None if error_code == "INVALID_REPLICATION_DATE" else self.watermark["deleted_through"]
+            return {"deleted": [], "deletedThrough": deleted_through, "deletedError": f"{error_code}: {error_message}"}
+
+        result = response.json()
+        deleted = [{"Id": record["id"], "deletedDate": record["deletedDate"]}
+                   for record in result.get("deletedRecords", [])]
+        increment("deleted_records", len(deleted))
+        return {"deleted": deleted, "deletedThrough": result.get("latestDateCovered")}
+
+    def commit(self, deleted_through: Optional[str] = None) -> dict[str, Any]:
+        watermark = dict(self.watermark or {})
+        if self.last_seen:
+            watermark["ts"], watermark["id"] = self.last_seen
+        elif not watermark:
+            # Nothing matched yet; start from slightly before this run to absorb clock skew with the org.
+            watermark["ts"] = format_salesforce_datetime(self.started_at - timedelta(seconds=CLOCK_SKEW_SECONDS))
+            watermark["id"] = ""
+        watermark["deleted_through"] = deleted_through or format_salesforce_datetime(self.started_at)
+
+        try:
+            with timed("storage_set"):
+                self.session_manager.storage.set(
+                    self.storage_key, json.dumps(watermark, separators=(',', ':')).encode('utf-8'))
+        except Exception as e:
+            logger.warning(f"Failed to store delta watermark: {e}")
+
+        return watermark
@@ -0,0 +1,104 @@
+import os
+import logging
+import threading
+import urllib.parse
+from typing import Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.metrics import timed, record_time, increment
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+API_VERSION = "v63.0"
+POOL_CONNECTIONS = int(os.getenv("SALESFORCE_HTTP_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("SALESFORCE_HTTP_POOL_MAXSIZE", "16"))
+CONNECT_TIMEOUT = float(os.getenv("SALESFORCE_HTTP_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("SALESFORCE_HTTP_READ_TIMEOUT", "30"))
+
+_clients: dict[str, requests.Session] = {}
+_clients_lock = threading.Lock()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        with timed("http_connect"):
+            super().connect()
+        increment("http_connections")
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        with timed("http_connect"):
+            super().connect()
+        increment("http_connections")
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool
+        }
+
+
+def _record_response(response: requests.Response, *args, **kwargs) -> None:
+    record_time("http_response", response.elapsed.total_seconds())
+    increment("http_requests")
+
+
+def _origin(url: str) -> str:
+    parsed = urllib.parse.urlsplit(url)
+    return f"{parsed.scheme}://{parsed.netloc}".lower()
+
+
+def _create_client() -> requests.Session:
+    client = requests.Session()
+    adapter = _TimedHTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    client.mount("https://", adapter)
+    client.mount("http://", adapter)
+    client.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive"
+    })
+    client.hooks["response"].append(_record_response)
+    return client
+
+
+def get_http_client(url: str) -> requests.Session:
+    origin = _origin(url)
+    client = _clients.get(origin)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(origin)
+        if client is None:
+            logger.info("Creating pooled HTTP client for %s (pool size %d)", origin, POOL_MAXSIZE)
+            client = _create_client()
+            _clients[origin] = client
+        return client
+
+
+def get_timeout(read_timeout: Optional[float] = None) -> Tuple[float, float]:
+    return CONNECT_TIMEOUT, read_timeout if read_timeout is not None else READ_TIMEOUT
+
+
+def close_http_clients() -> None:
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextlib
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Optional
+from dify_plugin.config.logger_format import plugin_logger_handler
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+ENABLED = os.getenv("SALESFORCE_METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+_NOOP = contextlib.nullcontext()
+_current: ContextVar[Optional["InvocationMetrics"]] = ContextVar("salesforce_invocation_metrics", default=None)
+_process_counters: defaultdict[str, int] = defaultdict(int)
+_process_counters_lock = threading.Lock()
+
+
+class InvocationMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.phases: dict[str, list[float]] = {}
+        self.counters: defaultdict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._token = None
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            totals = self.phases.setdefault(phase, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] += amount
+
+    def summary(self) -> dict[str, Any]:
+        phases = {
+            phase: {"ms": round(seconds * 1000, 2), "count": count}
+            for phase, (seconds, count) in self.phases.items()
+        }
+        if "http_response" in phases:
+            # Time to response headers includes connection setup; report the server share separately.
+            connect_ms = phases.get("http_connect", {}).get("ms", 0.0)
+            phases["http_server"] = {
+                "ms": round(max(0.0, phases["http_response"]["ms"] - connect_ms), 2),
+                "count": phases["http_response"]["count"]
+            }
+
+        return {
+            "invocation": self.name,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "phases": phases,
+            "counters": dict(self.counters)
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "phase", "start")
+
+    def __init__(self, metrics: InvocationMetrics, phase: str):
+        self.metrics = metrics
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.add_time(self.phase, time.perf_counter() - self.start)
+        return False
+
+
+def timed(phase: str):
+    metrics = _current.get()
+    if metrics is None:
+        return _NOOP
+    return _Timer(metrics, phase)
+
+
+def record_time(phase: str, seconds: float) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_time(phase, seconds)
+
+
+def increment(counter: str, amount: int = 1) -> None:
+    with _process_counters_lock:
+        _process_counters[counter] += amount
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.increment(counter, amount)
+
+
+def process_counters() -> dict[str, int]:
+    with _process_counters_lock:
+        return dict(_process_counters)
+
+
+def start_invocation(name: str, force: bool = False) -> Optional[InvocationMetrics]:
+    if not (ENABLED or force):
+        return None
+    metrics = InvocationMetrics(name)
+    metrics._token = _current.set(metrics)
+    return metrics
+
+
+def finish_invocation(metrics: Optional[InvocationMetrics]) -> Optional[dict[str, Any]]:
+    if metrics is None:
+        return None
+    try:
+        _current.reset(metrics._token)
+    except (ValueError, RuntimeError):
+        _current.set(None)
+
+    summary = metrics.summary()
+    logger.info("salesforce_metrics %s", json.dumps(summary, separators=(',', ':')))
+    return summary
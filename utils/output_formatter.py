@@ -0,0 +1,113 @@
+import io
+import csv
+import json
+from typing import Any
+from utils.record_stream import compact_record
+from utils.soql_parser import SoqlStatement
+
+OUTPUT_FORMATS = ("json", "columnar", "csv", "markdown_table")
+
+
+def _cell_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    return str(value)
+
+
+def _markdown_cell(value: Any) -> str:
+    return _cell_text(value).replace("|", "\\|").replace("\r", " ").replace("\n", "<br>")
+
+
+def _declared_relationship_fields(soql_query: str) -> dict[str, list[str]]:
+    try:
+        statement = SoqlStatement.parse(soql_query)
+    except Exception:
+        return {}
+
+    from_parts = statement.get("FROM").split()
+    qualifiers = {part.lower() + "." for part in from_parts if part.upper() != "AS"}
+    declared: dict[str, list[str]] = {}
+    for field in statement.fields:
+        if "(" in field or field.upper().startswith("TYPEOF"):
+            continue
+        path = field.split()[0]
+        qualifier = next((q for q in qualifiers if path.lower().startswith(q)), None)
+        if qualifier:
+            path = path[len(qualifier):]
+        parts = path.split(".")
+        for depth in range(1, len(parts)):
+            declared.setdefault(".".join(parts[:depth]).lower(), []).append(path)
+    return declared
+
+
+class BatchFormatter:
+    def __init__(self, output_format: str, soql_query: str = ""):
+        self.output_format = output_format
+        self.columns: list[str] = []
+        self._known: set[str] = set()
+        # Relationship names that flatten into dotted columns; a null lookup must not bring back the bare name.
+        self._declared = _declared_relationship_fields(soql_query) if soql_query else {}
+        self._parents: set[str] = set(self._declared)
+
+    def _add_column(self, column: str) -> None:
+        self.columns.append(column)
+        self._known.add(column.lower())
+        parts = column.split(".")
+        self._parents.update(".".join(parts[:depth]).lower() for depth in range(1, len(parts)))
+
+    def _update_columns(self, rows: list[dict[str, Any]]) -> bool:
+        added = False
+        for row in rows:
+            for field in row:
+                key = field.lower()
+                if key in self._known:
+                    continue
+                if key in self._parents:
+                    for child in self._declared.get(key, []):
+                        if child.lower() not in self._known:
+                            self._add_column(child)
+                            added = True
+                    continue
+                self._add_column(field)
+                added = True
+
+        # Only a null parent seen before any of its children can still be a column here.
+        stale = {column for column in self.columns if column.lower() in self._parents}
+        if stale:
+            self.columns = [column for column in self.columns if column not in stale]
+            self._known.difference_update(column.lower() for column in stale)
+            added = True
+        return added
+
+    def format(self, records: list[dict[str, Any]]) -> Any:
+        rows = [compact_record(record, flatten=True) for record in records]
+        columns_changed = self._update_columns(rows)
+        lowered = [{field.lower(): value for field, value in row.items()} for row in rows]
+        values = [[row.get(column.lower()) for column in self.columns] for row in lowered]
+
+        if self.output_format == "columnar":
+            return {"fields": list(self.columns), "rows": values}
+        if self.output_format == "csv":
+            return self._format_csv(values, columns_changed)
+        return self._format_markdown(values, columns_changed)
+
+    def _format_csv(self, values: list[list[Any]], include_header: bool) -> str:
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        if include_header:
+            writer.writerow(self.columns)
+        writer.writerows([[_cell_text(value) for value in row] for row in values])
+        return output.getvalue()
+
+    def _format_markdown(self, values: list[list[Any]], include_header: bool) -> str:
+        lines = []
+        if include_header:
+            lines.append("| " + " | ".join(_markdown_cell(column) for column in self.columns) + " |")
+            lines.append("|" + "---|" * len(self.columns))
+        for row in values:
+            lines.append("| " + " | ".join(_markdown_cell(value) for value in row) + " |")
+        return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,205 @@
+import os
+import math
+import queue
+import logging
+import threading
+import contextvars
+from collections.abc import Callable, Generator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.metrics import increment
+from utils.retry_policy import api_usage, API_USAGE_SOFT_LIMIT
+from utils.session_manager import SalesforceSessionManager
+from utils.soql_pager import SoqlPager
+from utils.soql_parser import SoqlStatement
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+SHARD_RECORDS = int(os.getenv("SALESFORCE_PARALLEL_SHARD_RECORDS", "20000"))
+MAX_WORKERS = int(os.getenv("SALESFORCE_PARALLEL_MAX_WORKERS", "4"))
+MAX_SHARDS = 64
+SHARD_QUEUE_DEPTH = 8
+QUEUE_POLL_SECONDS = 0.1
+
+ID_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+ID_LENGTH = 15
+
+_SHARD_DONE = object()
+
+
+def _id_to_int(record_id: str) -> int:
+    value = 0
+    for char in record_id[:ID_LENGTH]:
+        value = value * len(ID_ALPHABET) + ID_ALPHABET.index(char)
+    return value
+
+
+def _int_to_id(value: int) -> str:
+    chars = []
+    for _ in range(ID_LENGTH):
+        value, remainder = divmod(value, len(ID_ALPHABET))
+        chars.append(ID_ALPHABET[remainder])
+    return "".join(reversed(chars))
+
+
+def split_id_range(min_id: str, max_id: str, shards: int) -> list[str]:
+    low, high = _id_to_int(min_id), _id_to_int(max_id)
+    step = (high - low) / shards
+    boundaries = []
+    for index in range(1, shards):
+        boundary = _int_to_id(low + math.ceil(step * index))
+        if boundary > _int_to_id(low) and (not boundaries or boundary > boundaries[-1]):
+            boundaries.append(boundary)
+    return boundaries
+
+
+class PkChunkedQuery:
+    def __init__(self, session_manager: SalesforceSessionManager, soql_query: str,
+                 batch_size: Optional[int] = None, query_all: bool = False,
+                 shard_records: int = SHARD_RECORDS, max_workers: int = MAX_WORKERS,
+                 record_transform: Optional[Callable[[dict[str, Any]], dict[str, Any]]] = None):
+        self.session_manager = session_manager
+        self.soql_query = soql_query
+        self.batch_size = batch_size
+        self.query_all = query_all
+        self.shard_records = shard_records
+        self.max_workers = max_workers
+        self.record_transform = record_transform
+        self.shard_queries: list[str] = []
+        self.workers = 1
+        self.total_size = 0
+        self.records_returned = 0
+        self.batches_returned = 0
+        self._stop = threading.Event()
+
+    def _ineligible_reason(self, statement: SoqlStatement) -> Optional[str]:
+        if statement.is_aggregate:
+            return "aggregate queries cannot be split"
+        for keyword in ("LIMIT", "OFFSET", "FOR", "HAVING"):
+            if statement.get(keyword):
+                return f"{keyword} clause present"
+        order_by = statement.get("ORDER BY")
+        if order_by and " ".join(order_by.split()).lower() not in ("id", "id asc"):
+            return "results are ordered by a field other than Id"
+        return None
+
+    def _sample(self, statement: SoqlStatement, descending: bool) -> tuple[int, Optional[str]]:
+        sample = statement.replace(select="Id", order_by="Id DESC" if descending else "Id")
+        pager = SoqlPager(self.session_manager, sample.to_soql(), batch_size=200, max_records=1,
+                          query_all=self.query_all)
+        records = [record for batch in pager.iter_batches() for record in batch["records"]]
+        return pager.total_size, records[0]["Id"] if records else None
+
+    def _worker_count(self, shards: int) -> int:
+        _, instance_url = self.session_manager.get_valid_session()
+        headroom = max(0.0, 1.0 - api_usage.usage_ratio(instance_url) / API_USAGE_SOFT_LIMIT)
+        return max(1, min(shards, round(self.max_workers * headroom)))
+
+    def plan(self) -> bool:
+        try:
+            statement = SoqlStatement.parse(self.soql_query)
+        except Exception as e:
+            logger.info(f"Parallel extraction unavailable, running serially: {e}")
+            return False
+
+        reason = self._ineligible_reason(statement)
+        if reason:
+            logger.info(f"Parallel extraction unavailable ({reason}), running serially")
+            return False
+
+        total_size, min_id = self._sample(statement, descending=False)
+        if total_size < 2 * self.shard_records or not min_id:
+            logger.info("Query matches %d record(s), below the parallel threshold, running serially", total_size)
+            return False
+
+        _, max_id = self._sample(statement, descending=True)
+        if not max_id:
+            return False
+
+        shards = min(MAX_SHARDS, math.ceil(total_size / self.shard_records))
+        boundaries = split_id_range(min_id, max_id, shards)
+        if not boundaries:
+            return False
+
+        # Open-ended outer shards keep the union identical to the serial query even if rows were added meanwhile.
+        edges = [None] + boundaries + [None]
+        ordered = statement.replace(order_by="Id") if statement.get("ORDER BY") else statement
+        for lower, upper in zip(edges, edges[1:]):
+            shard = ordered
+            if lower:
+                shard = shard.and_where(f"Id >= '{lower}'")
+            if upper:
+                shard = shard.and_where(f"Id < '{upper}'")
+            self.shard_queries.append(shard.to_soql())
+
+        self.total_size = total_size
+        self.workers = self._worker_count(len(self.shard_queries))
+        logger.info("Split query over %d record(s) into %d Id-range shard(s) with %d worker(s)",
+                    self.total_size, len(self.shard_queries), self.workers)
+        return True
+
+    def _put(self, output: queue.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                output.put(item, timeout=QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run_shard(self, shard_query: str, output: queue.Queue) -> None:
+        try:
+            pager = SoqlPager(self.session_manager, shard_query, batch_size=self.batch_size,
+                              query_all=self.query_all, record_transform=self.record_transform)
+            for batch in pager.iter_batches():
+                if not self._put(output, batch["records"]):
+                    return
+            increment("shards")
+            self._put(output, _SHARD_DONE)
+        except Exception as e:
+            self._put(output, e)
+
+    def _iter_shard_records(self) -> Generator[list[dict[str, Any]], None, None]:
+        outputs = [queue.Queue(maxsize=SHARD_QUEUE_DEPTH) for _ in self.shard_queries]
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for shard_query, output in zip(self.shard_queries, outputs):
+                executor.submit(contextvars.copy_context().run, self._run_shard, shard_query, output)
+
+            # Shards are drained in Id order so the merged stream keeps the serial ordering.
+            for output in outputs:
+                while True:
+                    item = output.get()
+                    if item is _SHARD_DONE:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            self._stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def iter_batches(self) -> Generator[dict[str, Any], None, None]:
+        pending = None
+        for records in self._iter_shard_records():
+            if not records:
+                continue
+            if pending is not None:
+                yield pending
+            self.records_returned += len(records)
+            self.batches_returned += 1
+            pending = {
+                "totalSize": self.total_size,
+                "done": False,
+                "records": records,
+                "batch": self.batches_returned,
+                "nextRecordsUrl": None,
+            }
+
+        if pending is None:
+            self.batches_returned = 1
+            pending = {"totalSize": 0, "done": True, "records": [], "batch": 1, "nextRecordsUrl": None}
+        yield dict(pending, done=True)
@@ -0,0 +1,118 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from dify_plugin.config.logger_format import plugin_logger_handler
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+MAX_CACHE_BYTES = int(os.getenv("SALESFORCE_QUERY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+MAX_ENTRY_FRACTION = 0.25
+RELATIVE_DATE_TTL_SECONDS = 30
+
+_RELATIVE_DATE_PATTERN = re.compile(
+    r"\b(yesterday|today|tomorrow"
+    r"|(last|this|next)_(week|month|quarter|year|fiscal_quarter|fiscal_year)"
+    r"|(last|next)_90_days"
+    r"|(last|next)_n_\w+:\s*\d+"
+    r"|n_\w+_ago:\s*\d+)\b")
+
+
+def normalize_soql(soql_query: str) -> str:
+    parts = []
+    for index, part in enumerate(re.split(r"('(?:[^'\\]|\\.)*')", soql_query)):
+        if index % 2:
+            parts.append(part)
+        else:
+            parts.append(" ".join(part.split()).lower())
+    return "".join(parts).strip()
+
+
+def has_relative_date_literal(normalized_query: str) -> bool:
+    unquoted = re.sub(r"'(?:[^'\\]|\\.)*'", "''", normalized_query)
+    return bool(_RELATIVE_DATE_PATTERN.search(unquoted))
+
+
+class QueryResultCache:
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Tuple, Tuple[float, int, list]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(login_url: str, username: str, soql_query: str, *options: Any) -> Tuple:
+        return (login_url.lower(), username, normalize_soql(soql_query)) + tuple(options)
+
+    @staticmethod
+    def effective_ttl(soql_query: str, ttl: float) -> float:
+        if has_relative_date_literal(normalize_soql(soql_query)):
+            return min(ttl, RELATIVE_DATE_TTL_SECONDS)
+        return ttl
+
+    def get(self, key: Tuple) -> Optional[list]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: Tuple, batches: list, ttl: float, size: Optional[int] = None) -> bool:
+        if ttl <= 0:
+            return False
+        if size is None:
+            size = self.estimate_size(batches)
+        if size > self.max_bytes * MAX_ENTRY_FRACTION:
+            logger.info(f"Query result of {size} bytes exceeds the per-entry cache budget, not caching")
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (time.time() + ttl, size, batches)
+            self.current_bytes += size
+        return True
+
+    def _remove(self, key: Tuple) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    @staticmethod
+    def estimate_size(batches: list) -> int:
+        return sum(len(json.dumps(batch, separators=(',', ':'))) for batch in batches)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+
+query_cache = QueryResultCache()
@@ -0,0 +1,151 @@
+import os
+import re
+import time
+import logging
+import threading
+import urllib.parse
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+import requests
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.http_client import API_VERSION, get_http_client, get_timeout
+from utils.metrics import timed, increment
+from utils.query_cache import normalize_soql
+from utils.retry_policy import RetryPolicy, extract_error
+from utils.session_manager import SalesforceSessionManager
+from utils.soql_parser import SoqlStatement
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+PLAN_GUARD_MODES = ("off", "limit", "reject")
+PLAN_CACHE_TTL_SECONDS = float(os.getenv("SALESFORCE_QUERY_PLAN_CACHE_TTL", "3600"))
+PLAN_CACHE_MAX_ENTRIES = 512
+LARGE_OBJECT_ROWS = int(os.getenv("SALESFORCE_PLAN_LARGE_OBJECT_ROWS", "100000"))
+GUARD_LIMIT = int(os.getenv("SALESFORCE_PLAN_GUARD_LIMIT", "2000"))
+MAX_RELATIVE_COST = 1.0
+
+_STRING_LITERAL_PATTERN = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def query_shape(soql_query: str) -> str:
+    shape = _STRING_LITERAL_PATTERN.sub("?", normalize_soql(soql_query))
+    return _NUMBER_LITERAL_PATTERN.sub("?", shape)
+
+
+def is_non_selective(plan: dict[str, Any]) -> bool:
+    return (plan.get("leadingOperationType") == "TableScan"
+            and float(plan.get("relativeCost") or 0) > MAX_RELATIVE_COST
+            and int(plan.get("sobjectCardinality") or 0) >= LARGE_OBJECT_ROWS)
+
+
+def describe_plan(plan: dict[str, Any]) -> str:
+    description = (f"{plan.get('leadingOperationType')} on {plan.get('sobjectType')} "
+                   f"({plan.get('sobjectCardinality')} rows, relative cost {plan.get('relativeCost')})")
+    notes = [note.get("description") for note in plan.get("notes") or [] if note.get("description")]
+    if notes:
+        description += ". " + " ".join(notes)
+    return description
+
+
+class QueryPlanCache:
+    def __init__(self, ttl: float = PLAN_CACHE_TTL_SECONDS, max_entries: int = PLAN_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Tuple, Tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Tuple, plan: dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, plan)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+plan_cache = QueryPlanCache()
+
+
+class QueryPlanGuard:
+    def __init__(self, session_manager: SalesforceSessionManager, mode: str = "limit",
+                 limit: int = GUARD_LIMIT, retry_policy: Optional[RetryPolicy] = None):
+        self.session_manager = session_manager
+        self.mode = mode
+        self.limit = limit
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    def _explain(self, soql_query: str) -> Optional[dict]:
+        path = f"/services/data/{API_VERSION}/query?explain={urllib.parse.quote(soql_query)}"
+
+        def send(session_id: str, instance_url: str) -> requests.Response:
+            return get_http_client(instance_url).get(
+                f"{instance_url}{path}", headers={"Authorization": f"Bearer {session_id}"}, timeout=get_timeout())
+
+        with timed("explain"):
+            response = self.retry_policy.execute(self.session_manager, send)
+
+        if response.status_code == 400:
+            _, error_message = extract_error(response)
+            logger.error(f"Query plan rejected the query: {error_message}")
+            raise Exception(f"Invalid SOQL query: {error_message}")
+        if response.status_code != 200:
+            logger.warning(f"Query plan unavailable (status {response.status_code}), skipping preflight")
+            return None
+
+        plans = response.json().get("plans") or []
+        # Plans are sorted by relative cost; the optimizer runs the first one.
+        return plans[0] if plans else None
+
+    def get_plan(self, soql_query: str) -> Optional[dict]:
+        key = (self.session_manager.login_url.lower(), self.session_manager.principal, query_shape(soql_query))
+        plan = plan_cache.get(key)
+        if plan is not None:
+            increment("plan_cache_hits")
+            return plan
+
+        plan = self._explain(soql_query)
+        if plan is not None:
+            plan_cache.put(key, plan)
+        return plan
+
+    def check(self, soql_query: str) -> str:
+        try:
+            plan = self.get_plan(soql_query)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Query plan preflight failed, running query unchecked: {e}")
+            return soql_query
+
+        if plan is None or not is_non_selective(plan):
+            return soql_query
+
+        description = describe_plan(plan)
+        statement = SoqlStatement.parse(soql_query)
+        limit = statement.get("LIMIT")
+        if limit and limit.isdigit() and int(limit) <= self.limit:
+            logger.info(f"Non-selective query is bounded by LIMIT {limit}: {description}")
+            return soql_query
+
+        if self.mode == "reject" or statement.is_aggregate:
+            logger.warning(f"Rejecting non-selective query: {description}")
+            raise Exception(
+                f"Invalid SOQL query: the filter is not selective and would scan the whole object ({description}). "
+                f"Filter on an indexed field such as Id, Name, OwnerId, CreatedDate or SystemModstamp, or add a LIMIT.")
+
+        logger.warning(f"Adding LIMIT {self.limit} to non-selective query: {description}")
+        increment("plan_rewrites")
+        return statement.replace(limit=str(self.limit)).to_soql()
@@ -0,0 +1,138 @@
+import json
+import codecs
+from collections.abc import Callable, Generator, Iterable
+from typing import Any, Optional
+
+BUFFER_COMPACT_THRESHOLD = 64 * 1024
+RECORD_FORMATS = ("raw", "compact", "flat")
+
+_WHITESPACE = " \t\n\r"
+
+
+class QueryResponseStream:
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self.bytes_read = 0
+        self.meta: dict[str, Any] = {}
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+
+        if self._pos > BUFFER_COMPACT_THRESHOLD:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+
+        for chunk in self._chunks:
+            if chunk:
+                self.bytes_read += len(chunk)
+                self._buffer += self._decoder.decode(chunk)
+                return True
+
+        self._buffer += self._decoder.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise Exception("Unexpected end of Salesforce response body")
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise Exception(f"Malformed Salesforce response: expected '{char}' at offset {self._pos}")
+        self._pos += 1
+
+    def _decode_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            # A number or literal that ends exactly at the buffer edge may continue in the next chunk.
+            if end >= len(self._buffer) and self._fill():
+                continue
+
+            self._pos = end
+            return value
+
+    def _iter_array(self) -> Generator[Any, None, None]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            yield self._decode_value()
+            separator = self._peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise Exception(f"Malformed Salesforce response: unexpected '{separator}' in records array")
+
+    def records(self, limit: Optional[int] = None) -> Generator[dict[str, Any], None, None]:
+        self._expect("{")
+
+        while True:
+            if self._peek() == "}":
+                self._pos += 1
+                return
+
+            key = self._decode_value()
+            self._expect(":")
+
+            if key == "records" and self._peek() == "[":
+                count = 0
+                for record in self._iter_array():
+                    if limit is not None and count >= limit:
+                        return
+                    count += 1
+                    yield record
+            else:
+                self.meta[key] = self._decode_value()
+
+            if self._peek() == ",":
+                self._pos += 1
+
+
+def compact_record(record: dict[str, Any], flatten: bool = False, prefix: str = "",
+                   target: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    result = {} if target is None else target
+
+    for field, value in record.items():
+        if field == "attributes":
+            continue
+
+        if isinstance(value, dict):
+            if "records" in value:
+                result[f"{prefix}{field}"] = [compact_record(child, flatten) for child in value["records"]]
+            elif flatten:
+                compact_record(value, True, f"{prefix}{field}.", result)
+            else:
+                result[f"{prefix}{field}"] = compact_record(value)
+        else:
+            result[f"{prefix}{field}"] = value
+
+    return result
+
+
+def get_record_transform(record_format: Optional[str]) -> Optional[Callable[[dict[str, Any]], dict[str, Any]]]:
+    if record_format == "compact":
+        return compact_record
+    if record_format == "flat":
+        return lambda record: compact_record(record, flatten=True)
+    return None
@@ -0,0 +1,154 @@
+import re
+import time
+import random
+import logging
+import threading
+from collections.abc import Callable
+from typing import Optional, Tuple
+import requests
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.metrics import timed, increment
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+ACTION_SUCCESS = "success"
+ACTION_REAUTH = "reauth"
+ACTION_BACKOFF = "backoff"
+ACTION_FAIL = "fail"
+
+REAUTH_ERROR_CODES = {"INVALID_SESSION_ID"}
+TRANSIENT_ERROR_CODES = {"SERVER_UNAVAILABLE", "UNABLE_TO_LOCK_ROW", "REQUEST_RUNNING_TOO_LONG"}
+TRANSIENT_STATUS_CODES = {500, 502, 503, 504}
+
+API_USAGE_SOFT_LIMIT = 0.85
+API_USAGE_MAX_THROTTLE_SECONDS = 5.0
+
+_LIMIT_INFO_PATTERN = re.compile(r"api-usage=(\d+)/(\d+)")
+
+
+class ApiUsageTracker:
+    def __init__(self):
+        self._usage: dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, instance_url: str, used: int, limit: int) -> None:
+        with self._lock:
+            self._usage[instance_url] = (used, limit)
+
+    def record_header(self, instance_url: str, limit_info: Optional[str]) -> None:
+        if not limit_info:
+            return
+        match = _LIMIT_INFO_PATTERN.search(limit_info)
+        if match:
+            self.record(instance_url, int(match.group(1)), int(match.group(2)))
+
+    def usage_ratio(self, instance_url: str) -> float:
+        used, limit = self._usage.get(instance_url, (0, 0))
+        return used / limit if limit else 0.0
+
+    def throttle_delay(self, instance_url: str) -> float:
+        ratio = self.usage_ratio(instance_url)
+        if ratio <= API_USAGE_SOFT_LIMIT:
+            return 0.0
+        pressure = min(1.0, (ratio - API_USAGE_SOFT_LIMIT) / (1.0 - API_USAGE_SOFT_LIMIT))
+        return API_USAGE_MAX_THROTTLE_SECONDS * pressure * pressure
+
+
+api_usage = ApiUsageTracker()
+
+
+def extract_error(response: requests.Response) -> Tuple[Optional[str], str]:
+    try:
+        error_data = response.json()
+        if isinstance(error_data, list) and error_data:
+            error_data = error_data[0]
+        return error_data.get("errorCode"), error_data.get("message", response.text)
+    except Exception:
+        return None, response.text
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def classify_response(self, response: requests.Response) -> str:
+        if response.status_code < 300:
+            return ACTION_SUCCESS
+
+        error_code, message = extract_error(response)
+        if error_code in REAUTH_ERROR_CODES or (response.status_code == 401 and error_code is None):
+            return ACTION_REAUTH
+        if error_code in TRANSIENT_ERROR_CODES or response.status_code in TRANSIENT_STATUS_CODES:
+            return ACTION_BACKOFF
+        if error_code == "REQUEST_LIMIT_EXCEEDED" and "TotalRequests" not in message:
+            # Concurrent request limits clear quickly; the daily TotalRequests quota does not.
+            return ACTION_BACKOFF
+        return ACTION_FAIL
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(self.max_delay, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def execute(self, session_manager, send: Callable[[str, str], requests.Response],
+                idempotent: bool = True) -> requests.Response:
+        reauthenticated = False
+        attempt = 0
+
+        while True:
+            session_id, instance_url = session_manager.get_valid_session()
+
+            delay = api_usage.throttle_delay(instance_url)
+            if delay:
+                logger.warning("API usage at %.0f%% of the daily limit, throttling for %.2fs",
+                               api_usage.usage_ratio(instance_url) * 100, delay)
+                increment("throttles")
+                with timed("throttle"):
+                    time.sleep(delay)
+
+            try:
+                response = send(session_id, instance_url)
+            except requests.exceptions.ConnectionError as e:
+                # Read timeouts are not retried: the request reached Salesforce and a slow query would only time out
+                # again, while a repeated POST could duplicate its side effects. ConnectTimeout is a ConnectionError.
+                attempt += 1
+                # Only a connect timeout guarantees a non-idempotent request was never sent.
+                if attempt >= self.max_attempts or not (
+                        idempotent or isinstance(e, requests.exceptions.ConnectTimeout)):
+                    raise
+                delay = self.backoff_delay(attempt)
+                logger.warning("Transient network error (%s), retrying in %.2fs", e, delay)
+                increment("retries")
+                with timed("backoff"):
+                    time.sleep(delay)
+                continue
+
+            api_usage.record_header(instance_url, response.headers.get("Sforce-Limit-Info"))
+            action = self.classify_response(response)
+
+            if action == ACTION_REAUTH and not reauthenticated:
+                logger.warning("Session rejected with status %d, refreshing session", response.status_code)
+                increment("reauths")
+                session_manager.refresh_session(session_id)
+                reauthenticated = True
+                continue
+
+            if action == ACTION_BACKOFF:
+                attempt += 1
+                if attempt < self.max_attempts:
+                    delay = self.backoff_delay(attempt, response.headers.get("Retry-After"))
+                    logger.warning("Transient Salesforce error (status %d), retrying in %.2fs",
+                                   response.status_code, delay)
+                    increment("retries")
+                    with timed("backoff"):
+                        time.sleep(delay)
+                    continue
+
+            return response
@@ -0,0 +1,246 @@
+import os
+import re
+import json
+import time
+import difflib
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Any, Optional, Tuple
+import requests
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.http_client import API_VERSION, get_http_client, get_timeout
+from utils.metrics import timed, increment
+from utils.retry_policy import RetryPolicy, extract_error
+from utils.session_manager import SalesforceSessionManager
+from utils.soql_parser import SoqlStatement
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+FRESH_SECONDS = float(os.getenv("SALESFORCE_SCHEMA_CACHE_TTL", "300"))
+SCHEMA_CACHE_MAX_ENTRIES = 256
+MAX_SUGGESTIONS = 3
+
+_STRING_LITERAL_PATTERN = re.compile(r"'(?:[^'\\]|\\.)*'")
+_SUBQUERY_START_PATTERN = re.compile(r"\(\s*SELECT\b", re.IGNORECASE)
+_CONDITION_FIELD_PATTERN = re.compile(
+    r"(?<![\w.:])([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)\s*(?:=|!=|<>|<=|>=|<|>|\bLIKE\b|\bNOT\s+IN\b|\bIN\b"
+    r"|\bINCLUDES\b|\bEXCLUDES\b)", re.IGNORECASE)
+_CONDITION_KEYWORDS = {"and", "or", "not"}
+
+_FIELD_KEYS = ("name", "label", "type", "referenceTo", "relationshipName", "filterable", "sortable", "nillable",
+               "custom", "picklistValues")
+
+
+def _compact_sobjects(describe: dict[str, Any]) -> dict[str, Any]:
+    return {"sobjects": [
+        {key: sobject.get(key) for key in ("name", "label", "keyPrefix", "custom", "queryable")}
+        for sobject in describe.get("sobjects", [])
+    ]}
+
+
+def _compact_describe(describe: dict[str, Any]) -> dict[str, Any]:
+    fields = []
+    for field in describe.get("fields", []):
+        compact = {key: field.get(key) for key in _FIELD_KEYS}
+        compact["picklistValues"] = [value["value"] for value in field.get("picklistValues") or [] if value.get("active")]
+        fields.append(compact)
+
+    return {
+        "name": describe.get("name"),
+        "label": describe.get("label"),
+        "keyPrefix": describe.get("keyPrefix"),
+        "queryable": describe.get("queryable"),
+        "fields": fields,
+        "childRelationships": [
+            {key: relationship.get(key) for key in ("relationshipName", "childSObject", "field")}
+            for relationship in describe.get("childRelationships", []) if relationship.get("relationshipName")
+        ]
+    }
+
+
+def condition_fields(where: str) -> list[str]:
+    where = _STRING_LITERAL_PATTERN.sub("''", where)
+    while True:
+        match = _SUBQUERY_START_PATTERN.search(where)
+        if not match:
+            break
+        depth, end = 0, match.start()
+        for end in range(match.start(), len(where)):
+            depth += {"(": 1, ")": -1}.get(where[end], 0)
+            if depth == 0:
+                break
+        where = where[:match.start()] + "()" + where[end + 1:]
+    return [field for field in _CONDITION_FIELD_PATTERN.findall(where) if field.lower() not in _CONDITION_KEYWORDS]
+
+
+def suggest(name: str, candidates: list[str]) -> str:
+    by_lower = {candidate.lower(): candidate for candidate in candidates}
+    matches = difflib.get_close_matches(name.lower(), list(by_lower), n=MAX_SUGGESTIONS, cutoff=0.6)
+    return f" Did you mean: {', '.join(by_lower[match] for match in matches)}?" if matches else ""
+
+
+class SchemaCache:
+    def __init__(self, max_entries: int = SCHEMA_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Tuple, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+schema_cache = SchemaCache()
+
+
+class SchemaRegistry:
+    def __init__(self, session_manager: SalesforceSessionManager, retry_policy: Optional[RetryPolicy] = None):
+        self.session_manager = session_manager
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    def _cache_key(self, resource: str) -> Tuple:
+        return self.session_manager.login_url.lower(), self.session_manager.principal, resource
+
+    def _storage_key(self, resource: str) -> str:
+        digest = hashlib.sha256("|".join(self._cache_key(resource)).encode('utf-8')).hexdigest()[:32]
+        return f"salesforce_schema_{digest}"
+
+    def _load_stored(self, resource: str) -> Optional[dict[str, Any]]:
+        try:
+            with timed("storage_get"):
+                record = self.session_manager.storage.get(self._storage_key(resource))
+            return json.loads(record) if record else None
+        except Exception as e:
+            logger.warning(f"Error reading stored schema for {resource}: {e}")
+            return None
+
+    def _store(self, resource: str, entry: dict[str, Any]) -> None:
+        schema_cache.put(self._cache_key(resource), entry)
+        try:
+            with timed("storage_set"):
+                self.session_manager.storage.set(self._storage_key(resource),
+                                                 json.dumps(entry, separators=(',', ':')).encode('utf-8'))
+        except Exception as e:
+            logger.warning(f"Failed to store schema for {resource}: {e}")
+
+    def _fetch(self, path: str, last_modified: Optional[str]) -> requests.Response:
+        headers = {"Accept": "application/json"}
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        def send(session_id: str, instance_url: str) -> requests.Response:
+            return get_http_client(instance_url).get(
+                f"{instance_url}{path}", headers=dict(headers, Authorization=f"Bearer {session_id}"),
+                timeout=get_timeout())
+
+        with timed("describe"):
+            return self.retry_policy.execute(self.session_manager, send)
+
+    def _get(self, resource: str, path: str, compact) -> Optional[dict[str, Any]]:
+        key = self._cache_key(resource)
+        entry = schema_cache.get(key) or self._load_stored(resource)
+        if entry and time.time() - entry["checked"] < FRESH_SECONDS:
+            increment("schema_cache_hits")
+            schema_cache.put(key, entry)
+            return entry["data"]
+
+        response = self._fetch(path, entry["last_modified"] if entry else None)
+        if response.status_code == 304 and entry:
+            logger.debug("Schema for %s not modified", resource)
+            increment("schema_revalidations")
+            self._store(resource, dict(entry, checked=time.time()))
+            return entry["data"]
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            error_code, error_message = extract_error(response)
+            raise Exception(f"Salesforce API error (status {response.status_code}, {error_code}): {error_message}")
+
+        data = compact(response.json())
+        self._store(resource, {
+            "data": data,
+            "last_modified": response.headers.get("Last-Modified") or formatdate(usegmt=True),
+            "checked": time.time()
+        })
+        return data
+
+    def list_sobjects(self) -> list[dict[str, Any]]:
+        data = self._get("sobjects", f"/services/data/{API_VERSION}/sobjects/", _compact_sobjects)
+        return data["sobjects"] if data else []
+
+    def describe(self, sobject: str) -> Optional[dict[str, Any]]:
+        names = {entry["name"].lower(): entry["name"] for entry in self.list_sobjects()}
+        name = names.get(sobject.lower())
+        if name is None:
+            return None
+        return self._get(f"sobject:{name}", f"/services/data/{API_VERSION}/sobjects/{name}/describe/",
+                         _compact_describe)
+
+    def _resolve_field(self, describe: dict[str, Any], path: str) -> Optional[str]:
+        segments = path.split(".")
+        for relationship in segments[:-1]:
+            field = next((field for field in describe["fields"]
+                          if (field.get("relationshipName") or "").lower() == relationship.lower()), None)
+            if field is None:
+                return (f"Didn't understand relationship '{relationship}' in field path '{path}' on entity "
+                        f"'{describe['name']}'.") + suggest(relationship, [
+                    field["relationshipName"] for field in describe["fields"] if field.get("relationshipName")])
+            if len(field.get("referenceTo") or []) != 1:
+                return None
+            describe = self.describe(field["referenceTo"][0])
+            if describe is None:
+                return None
+
+        field_names = [field["name"] for field in describe["fields"]]
+        if segments[-1].lower() not in {name.lower() for name in field_names}:
+            return (f"No such column '{segments[-1]}' on entity '{describe['name']}'."
+                    + suggest(segments[-1], field_names))
+        return None
+
+    def validate_query(self, soql_query: str) -> None:
+        statement = SoqlStatement.parse(soql_query)
+        from_tokens = statement.get("FROM").split()
+        sobject = from_tokens[0]
+        alias = from_tokens[1].lower() if len(from_tokens) > 1 else None
+
+        describe = self.describe(sobject)
+        if describe is None:
+            raise Exception(f"Invalid SOQL query: sObject type '{sobject}' is not supported."
+                            + suggest(sobject, [entry["name"] for entry in self.list_sobjects()]))
+
+        paths = []
+        for item in statement.fields:
+            if "(" in item or item.upper().startswith("TYPEOF"):
+                continue
+            paths.append(item.split()[0])
+        paths += condition_fields(statement.get("WHERE") or "")
+        for item in (statement.get("ORDER BY") or "").split(","):
+            if item.strip() and "(" not in item:
+                paths.append(item.split()[0])
+
+        for path in paths:
+            if alias and path.lower().startswith(f"{alias}."):
+                path = path[len(alias) + 1:]
+            error = self._resolve_field(describe, path)
+            if error:
+                logger.warning(f"Schema validation failed: {error}")
+                raise Exception(f"Invalid SOQL query: {error}")
@@ -0,0 +1,34 @@
+import time
+import threading
+from typing import Any, Optional, Tuple
+
+
+class SessionCache:
+    def __init__(self):
+        self._entries: dict[Tuple[str, str], dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str], min_ttl: float = 0.0) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["exp"] - min_ttl <= time.time():
+            self.invalidate(key, entry)
+            return None
+        return entry
+
+    def put(self, key: Tuple[str, str], entry: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+
+    def invalidate(self, key: Tuple[str, str], entry: Optional[dict[str, Any]] = None) -> None:
+        with self._lock:
+            if entry is None or self._entries.get(key) is entry:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+session_cache = SessionCache()
@@ -1,26 +1,114 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
 import requests
 import logging
 import xml.etree.ElementTree as ET
-from typing import Optional, Tuple
+import jwt
+from typing import Any, Optional, Tuple
 from datetime import datetime, timedelta
 from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.http_client import API_VERSION, get_http_client, get_timeout, READ_TIMEOUT
+from utils.metrics import timed, increment
+from utils.session_cache import session_cache
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 logger.addHandler(plugin_logger_handler)
 
+SESSION_EXPIRY_MARGIN_SECONDS = 300
+LOGIN_LEASE_SECONDS = 45
+LOGIN_LEASE_POLL_SECONDS = 0.5
+DEFAULT_SESSION_SECONDS = 7200
+REFRESH_AHEAD_SECONDS = int(os.getenv("SALESFORCE_SESSION_REFRESH_AHEAD_SECONDS", "0"))
+
+AUTH_METHOD_PASSWORD = "password"
+AUTH_METHOD_JWT_BEARER = "oauth_jwt_bearer"
+AUTH_METHOD_CLIENT_CREDENTIALS = "oauth_client_credentials"
+AUTH_METHODS = (AUTH_METHOD_PASSWORD, AUTH_METHOD_JWT_BEARER, AUTH_METHOD_CLIENT_CREDENTIALS)
+
+REQUIRED_CREDENTIALS = {
+    AUTH_METHOD_PASSWORD: ("salesforce_username", "salesforce_password_with_security_token"),
+    AUTH_METHOD_JWT_BEARER: ("salesforce_username", "salesforce_client_id", "salesforce_private_key"),
+    AUTH_METHOD_CLIENT_CREDENTIALS: ("salesforce_client_id", "salesforce_client_secret")
+}
+CREDENTIAL_LABELS = {
+    "salesforce_login_url": "Salesforce Login URL",
+    "salesforce_username": "Salesforce Username",
+    "salesforce_password_with_security_token": "Salesforce Password + Security Token",
+    "salesforce_client_id": "Salesforce Connected App Consumer Key",
+    "salesforce_client_secret": "Salesforce Connected App Consumer Secret",
+    "salesforce_private_key": "Salesforce Connected App Private Key"
+}
+
+OAUTH_TOKEN_PATH = "/services/oauth2/token"
+JWT_BEARER_GRANT_TYPE = "urn:ietf:params:oauth:grant-type:jwt-bearer"
+JWT_ASSERTION_SECONDS = 180
+INVALID_OAUTH_ERRORS = {"invalid_grant", "invalid_client", "invalid_client_id", "unauthorized_client"}
+
+_login_locks: dict[Tuple[str, str], threading.Lock] = {}
+_login_locks_guard = threading.Lock()
+_refreshes_in_flight: set[Tuple[str, str]] = set()
+
+
+def get_auth_method(credentials: dict[str, Any]) -> str:
+    auth_method = credentials.get("salesforce_auth_method") or AUTH_METHOD_PASSWORD
+    if auth_method not in AUTH_METHODS:
+        raise Exception(f"Unsupported Salesforce authentication method '{auth_method}'.")
+    return auth_method
+
+
+def get_missing_credentials(credentials: dict[str, Any]) -> list[str]:
+    required = ("salesforce_login_url",) + REQUIRED_CREDENTIALS[get_auth_method(credentials)]
+    return [key for key in required if not credentials.get(key)]
+
 
 class SalesforceSessionManager:
-    def __init__(self, username: str, password_with_token: str, login_url: str, storage):
+    def __init__(self, username: Optional[str], password_with_token: Optional[str], login_url: str, storage,
+                 auth_method: str = AUTH_METHOD_PASSWORD, client_id: Optional[str] = None,
+                 client_secret: Optional[str] = None, private_key: Optional[str] = None):
         self.username = username
         self.password_with_token = password_with_token
         self.login_url = login_url.strip().rstrip('/')
         self.storage = storage
-        self.session_key = f"salesforce_session_{username}"
-        self.instance_url_key = f"salesforce_instance_url_{username}"
-        self.session_expiry_key = f"salesforce_session_expiry_{username}"
-
-        logger.info(f"Initialized Salesforce session manager for user: {username[:3]}***")
+        self.auth_method = auth_method
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.private_key = private_key.replace("\\n", "\n") if private_key else private_key
+        # Password sessions keep their original key so existing stored sessions stay valid.
+        self.principal = username if auth_method == AUTH_METHOD_PASSWORD else f"{auth_method}:{client_id}:{username or ''}"
+        self.cache_key = (self.login_url.lower(), self.principal)
+        credential_digest = hashlib.sha256(f"{self.cache_key[0]}|{self.principal}".encode('utf-8')).hexdigest()[:32]
+        self.storage_key = f"salesforce_session_{credential_digest}"
+        self.lease_key = f"salesforce_login_lease_{credential_digest}"
+        self.lease_owner = uuid.uuid4().hex
+
+        logger.debug("Initialized Salesforce session manager (%s) for: %s***", auth_method, (username or client_id)[:3])
+
+    @classmethod
+    def from_credentials(cls, credentials: dict[str, Any], storage) -> "SalesforceSessionManager":
+        missing = get_missing_credentials(credentials)
+        if missing:
+            logger.error(f"Missing Salesforce credential: {missing[0]}")
+            raise Exception(
+                f"Salesforce credential '{missing[0]}' is not configured. Please provide it in the plugin settings.")
+
+        return cls(credentials.get("salesforce_username"),
+                   credentials.get("salesforce_password_with_security_token"),
+                   credentials["salesforce_login_url"],
+                   storage,
+                   auth_method=get_auth_method(credentials),
+                   client_id=credentials.get("salesforce_client_id"),
+                   client_secret=credentials.get("salesforce_client_secret"),
+                   private_key=credentials.get("salesforce_private_key"))
+
+    def _login(self) -> Optional[Tuple[str, str]]:
+        if self.auth_method == AUTH_METHOD_PASSWORD:
+            return self._soap_login()
+        return self._oauth_login()
 
     def _soap_login(self) -> Optional[Tuple[str, str]]:
         logger.info(f"Starting SOAP login for user: {self.username[:3]}***")
@@ -43,23 +131,24 @@ class SalesforceSessionManager:
                 "SOAPAction": '""'
             }
 
-            request_url = f"{self.login_url}/services/Soap/u/63.0"
+            request_url = f"{self.login_url}/services/Soap/u/{API_VERSION.lstrip('v')}"
             logger.info(f"SOAP Login Request URL: {request_url}")
-            logger.info(f"Username: {self.username}")
-            logger.info(f"Password length: {len(self.password_with_token)} characters")
 
             logger.info("Sending SOAP login request to Salesforce")
-            response = requests.post(
-                request_url,
-                headers=headers,
-                data=soap_envelope,
-                timeout=30
-            )
+            increment("logins")
+            with timed("soap_login"):
+                response = get_http_client(request_url).post(
+                    request_url,
+                    headers=headers,
+                    data=soap_envelope,
+                    timeout=get_timeout()
+                )
 
             logger.info(f"SOAP login response status: {response.status_code}")
 
             if response.status_code == 200:
-                root = ET.fromstring(response.text)
+                with timed("soap_parse"):
+                    root = ET.fromstring(response.text)
 
                 namespaces = {
                     'soapenv': 'http://schemas.xmlsoap.org/soap/envelope/',
@@ -78,11 +167,19 @@ class SalesforceSessionManager:
 
                 instance_url = server_url.split('/services/')[0]
 
+                seconds_valid_elem = root.find('.//sf:userInfo/sf:sessionSecondsValid', namespaces)
+                try:
+                    seconds_valid = int(seconds_valid_elem.text)
+                except (AttributeError, TypeError, ValueError):
+                    logger.warning(
+                        f"sessionSecondsValid not found in SOAP response, assuming {DEFAULT_SESSION_SECONDS} seconds")
+                    seconds_valid = DEFAULT_SESSION_SECONDS
+
                 if session_id and instance_url:
-                    expiry_time = datetime.now() + timedelta(hours=23)
+                    expiry_time = datetime.now() + timedelta(seconds=seconds_valid)
                     logger.info(f"SOAP login successful, session expires at: {expiry_time.isoformat()}")
                     logger.info(f"Instance URL: {instance_url}")
-                    self._store_session(session_id, instance_url, expiry_time)
+                    self._store_session(session_id, instance_url, seconds_valid)
                     return session_id, instance_url
 
             elif response.status_code == 500:
@@ -97,7 +194,7 @@ class SalesforceSessionManager:
         except requests.exceptions.Timeout as e:
             logger.error(f"Salesforce login request timed out: {e}")
             raise Exception(
-                f"Salesforce login request timed out after 30 seconds. Check your network connection and login URL: {self.login_url}")
+                f"Salesforce login request timed out after {READ_TIMEOUT:g} seconds. Check your network connection and login URL: {self.login_url}")
         except requests.exceptions.ConnectionError as e:
             logger.error(f"Failed to connect to Salesforce: {e}")
             raise Exception(
@@ -148,63 +245,156 @@ class SalesforceSessionManager:
             logger.error(f"Failed to parse SOAP response: {parse_error}")
             raise Exception(f"Failed to parse SOAP response (XML Parse Error: {parse_error}). {error_details}")
 
-    def _store_session(self, session_id: str, instance_url: str, expiry_time: datetime) -> None:
+    def _jwt_audience(self) -> str:
+        host = self.login_url.lower()
+        if "test.salesforce.com" in host or ".sandbox.my.salesforce.com" in host:
+            return "https://test.salesforce.com"
+        return "https://login.salesforce.com"
+
+    def _build_jwt_assertion(self) -> str:
+        claims = {
+            "iss": self.client_id,
+            "sub": self.username,
+            "aud": self._jwt_audience(),
+            "exp": int(time.time()) + JWT_ASSERTION_SECONDS
+        }
         try:
-            logger.info("Storing Salesforce session in persistent storage")
+            return jwt.encode(claims, self.private_key, algorithm="RS256")
+        except (ValueError, TypeError, jwt.exceptions.PyJWTError) as e:
+            logger.error(f"Failed to sign JWT bearer assertion: {e}")
+            raise Exception(f"Invalid Salesforce private key for JWT bearer login: {e}")
+
+    def _oauth_login(self) -> Optional[Tuple[str, str]]:
+        logger.info(f"Starting OAuth {self.auth_method} login for client: {self.client_id[:6]}***")
+
+        if self.auth_method == AUTH_METHOD_JWT_BEARER:
+            form = {"grant_type": JWT_BEARER_GRANT_TYPE, "assertion": self._build_jwt_assertion()}
+        else:
+            form = {
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret
+            }
 
-            session_size = len(session_id.encode('utf-8'))
-            instance_url_size = len(instance_url.encode('utf-8'))
-            expiry_str = expiry_time.isoformat()
-            expiry_size = len(expiry_str.encode('utf-8'))
-            total_size = session_size + instance_url_size + expiry_size
+        request_url = f"{self.login_url}{OAUTH_TOKEN_PATH}"
+        try:
+            increment("logins")
+            with timed("oauth_login"):
+                response = get_http_client(request_url).post(
+                    request_url,
+                    headers={"Accept": "application/json"},
+                    data=form,
+                    timeout=get_timeout()
+                )
+        except requests.exceptions.Timeout as e:
+            logger.error(f"Salesforce token request timed out: {e}")
+            raise Exception(
+                f"Salesforce login request timed out after {READ_TIMEOUT:g} seconds. Check your network connection and login URL: {self.login_url}")
+        except requests.exceptions.ConnectionError as e:
+            logger.error(f"Failed to connect to Salesforce: {e}")
+            raise Exception(
+                f"Failed to connect to Salesforce at {self.login_url}. Check your login URL and network connection. Error: {e}")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Network error during Salesforce login: {e}")
+            raise Exception(f"Network error during Salesforce login request to {self.login_url}: {e}")
 
-            logger.info(
-                f"Session size: {session_size} bytes, instance URL size: {instance_url_size} bytes, "
-                f"expiry size: {expiry_size} bytes, total: {total_size} bytes")
+        logger.info(f"OAuth token response status: {response.status_code}")
 
-            self.storage.set(self.session_key, session_id.encode('utf-8'))
-            self.storage.set(self.instance_url_key, instance_url.encode('utf-8'))
-            self.storage.set(self.session_expiry_key, expiry_str.encode('utf-8'))
+        try:
+            token = response.json()
+        except ValueError:
+            token = {}
+
+        if response.status_code != 200:
+            error = token.get("error", "unknown_error")
+            description = token.get("error_description", response.text[:500])
+            logger.error(f"OAuth login failed: {error} - {description}")
+            if error in INVALID_OAUTH_ERRORS:
+                raise Exception(f"Invalid Salesforce OAuth credentials. Error: {error} - {description}")
+            raise Exception(
+                f"Salesforce login failed with status {response.status_code}. Error: {error} - {description}")
+
+        access_token = token.get("access_token")
+        instance_url = token.get("instance_url")
+        if not access_token or not instance_url:
+            logger.error("OAuth token response is missing access_token or instance_url")
+            raise Exception("Salesforce login failed: token response is missing access_token or instance_url")
+
+        # Token responses rarely carry expires_in; the org session timeout applies and 401s trigger a refresh.
+        try:
+            seconds_valid = int(token.get("expires_in") or DEFAULT_SESSION_SECONDS)
+        except (TypeError, ValueError):
+            seconds_valid = DEFAULT_SESSION_SECONDS
+
+        logger.info(f"OAuth login successful. Instance URL: {instance_url}")
+        self._store_session(access_token, instance_url, seconds_valid)
+        return access_token, instance_url
+
+    def _store_session(self, session_id: str, instance_url: str, seconds_valid: int) -> None:
+        entry = {
+            "sid": session_id,
+            "url": instance_url,
+            "exp": time.time() + seconds_valid,
+            "ttl": seconds_valid
+        }
+        self._persist_entry(entry)
+
+    def _persist_entry(self, entry: dict) -> None:
+        session_cache.put(self.cache_key, entry)
 
-            logger.info("Salesforce session successfully stored in persistent storage")
+        try:
+            record = json.dumps(entry, separators=(',', ':')).encode('utf-8')
+            logger.debug("Storing Salesforce session record (%d bytes) in persistent storage", len(record))
+
+            self._storage_set(self.storage_key, record)
 
         except Exception as e:
             logger.warning(f"Failed to store Salesforce session in persistent storage: {e}")
             logger.info("Plugin will authenticate on each request when storage is unavailable")
             pass
 
-    def _get_stored_session(self) -> Optional[Tuple[str, str]]:
-        logger.info("Checking for stored Salesforce session")
+    def _storage_get(self, key: str) -> Optional[bytes]:
+        with timed("storage_get"):
+            return self.storage.get(key)
 
-        try:
-            session_bytes = self.storage.get(self.session_key)
-            if not session_bytes:
-                logger.info("No stored Salesforce session found")
-                return None
+    def _storage_set(self, key: str, value: bytes) -> None:
+        with timed("storage_set"):
+            self.storage.set(key, value)
 
-            session_id = session_bytes.decode('utf-8')
+    def _storage_delete(self, key: str) -> None:
+        with timed("storage_delete"):
+            self.storage.delete(key)
 
-            instance_url_bytes = self.storage.get(self.instance_url_key)
-            if not instance_url_bytes:
-                logger.warning("Stored session found but no instance URL, considering invalid")
-                return None
+    def _read_storage_entry(self) -> Optional[dict]:
+        record = self._storage_get(self.storage_key)
+        if not record:
+            return None
 
-            instance_url = instance_url_bytes.decode('utf-8')
+        entry = json.loads(record)
+        if not entry.get("sid") or not entry.get("url") or not entry.get("exp"):
+            logger.warning("Stored session record is incomplete, considering invalid")
+            return None
+        return entry
 
-            expiry_bytes = self.storage.get(self.session_expiry_key)
-            if not expiry_bytes:
-                logger.warning("Stored session found but no expiry information, considering invalid")
-                return None
+    def _get_stored_session(self) -> Optional[Tuple[str, str]]:
+        entry = session_cache.get(self.cache_key, min_ttl=SESSION_EXPIRY_MARGIN_SECONDS)
+        if entry:
+            return entry["sid"], entry["url"]
 
-            expiry_str = expiry_bytes.decode('utf-8')
-            expiry_time = datetime.fromisoformat(expiry_str)
+        logger.debug("Checking for stored Salesforce session")
 
-            current_time = datetime.now()
-            if current_time + timedelta(minutes=5) < expiry_time:
-                logger.info(f"Valid stored session found, expires at: {expiry_time.isoformat()}")
-                return session_id, instance_url
+        try:
+            entry = self._read_storage_entry()
+            if not entry:
+                logger.debug("No stored Salesforce session found")
+                return None
+
+            if time.time() + SESSION_EXPIRY_MARGIN_SECONDS < entry["exp"]:
+                logger.debug("Valid stored session found, expires at: %s", datetime.fromtimestamp(entry["exp"]))
+                session_cache.put(self.cache_key, entry)
+                return entry["sid"], entry["url"]
             else:
-                logger.info(f"Stored session expired at: {expiry_time.isoformat()}, cleaning up")
+                logger.info(f"Stored session expired at: {datetime.fromtimestamp(entry['exp']).isoformat()}, cleaning up")
                 self._clear_stored_session()
                 return None
 
@@ -213,38 +403,162 @@ class SalesforceSessionManager:
             return None
 
     def _clear_stored_session(self) -> None:
+        session_cache.invalidate(self.cache_key)
         try:
             logger.info("Clearing stored Salesforce session from persistent storage")
-            self.storage.delete(self.session_key)
-            self.storage.delete(self.instance_url_key)
-            self.storage.delete(self.session_expiry_key)
+            self._storage_delete(self.storage_key)
             logger.info("Successfully cleared stored Salesforce session")
         except Exception as e:
             logger.warning(f"Error clearing stored session: {e}")
             pass
 
-    def get_valid_session(self) -> Tuple[str, str]:
-        logger.info("Getting valid Salesforce session")
+    def _acquire_login_lease(self) -> bool:
+        try:
+            record = self._storage_get(self.lease_key)
+            if record:
+                lease = json.loads(record)
+                if lease.get("owner") != self.lease_owner and lease.get("exp", 0) > time.time():
+                    return False
+
+            lease = {"owner": self.lease_owner, "exp": time.time() + LOGIN_LEASE_SECONDS}
+            self._storage_set(self.lease_key, json.dumps(lease, separators=(',', ':')).encode('utf-8'))
+
+            record = self._storage_get(self.lease_key)
+            return not record or json.loads(record).get("owner") == self.lease_owner
+
+        except Exception as e:
+            logger.warning(f"Login lease unavailable, logging in without it: {e}")
+            return True
+
+    def _release_login_lease(self) -> None:
+        try:
+            record = self._storage_get(self.lease_key)
+            if record and json.loads(record).get("owner") == self.lease_owner:
+                self._storage_delete(self.lease_key)
+        except Exception as e:
+            logger.warning(f"Error releasing login lease: {e}")
+
+    def _wait_for_leased_login(self, stale_session_id: Optional[str]) -> Optional[Tuple[str, str]]:
+        logger.info("Another plugin worker is logging in, waiting for its session")
+        deadline = time.time() + LOGIN_LEASE_SECONDS
+
+        while time.time() < deadline:
+            time.sleep(LOGIN_LEASE_POLL_SECONDS)
+            try:
+                entry = self._read_storage_entry()
+                if (entry and entry["sid"] != stale_session_id
+                        and time.time() + SESSION_EXPIRY_MARGIN_SECONDS < entry["exp"]):
+                    logger.info("Reusing session obtained by another plugin worker")
+                    session_cache.put(self.cache_key, entry)
+                    return entry["sid"], entry["url"]
+
+                if not self._storage_get(self.lease_key):
+                    logger.info("Login lease released without a usable session")
+                    return None
+            except Exception as e:
+                logger.warning(f"Error while waiting for login lease: {e}")
+                return None
+
+        logger.warning("Timed out waiting for another plugin worker to log in")
+        return None
+
+    def _coalesced_login(self, stale_session_id: Optional[str] = None,
+                         keep_stale: bool = False) -> Tuple[str, str]:
+        with _login_lock(self.cache_key):
+            session_data = self._get_stored_session()
+            if session_data and session_data[0] != stale_session_id:
+                logger.info("Using session obtained by a concurrent caller")
+                return session_data
+            if session_data and not keep_stale:
+                self._clear_stored_session()
+
+            lease_acquired = self._acquire_login_lease()
+            if not lease_acquired:
+                session_data = self._wait_for_leased_login(stale_session_id)
+                if session_data:
+                    return session_data
+
+            try:
+                logger.info("No valid cached session, authenticating for new session")
+                session_data = self._login()
+            finally:
+                if lease_acquired:
+                    self._release_login_lease()
+
+            if not session_data:
+                logger.error("Failed to obtain session from Salesforce")
+                raise Exception("Failed to obtain session from Salesforce")
 
-        session_data = self._get_stored_session()
-        if session_data:
-            logger.info("Using cached Salesforce session")
+            logger.info("Successfully obtained new Salesforce session")
             return session_data
 
-        logger.info("No valid cached session, authenticating for new session")
-        session_data = self._soap_login()
+    def _background_refresh(self, stale_session_id: str) -> None:
+        try:
+            self._coalesced_login(stale_session_id, keep_stale=True)
+            logger.info("Salesforce session proactively refreshed in background")
+        except Exception as e:
+            logger.warning(f"Background session refresh failed, will retry on next use: {e}")
+        finally:
+            with _login_locks_guard:
+                _refreshes_in_flight.discard(self.cache_key)
+
+    def _schedule_background_refresh(self, stale_session_id: str) -> None:
+        with _login_locks_guard:
+            if self.cache_key in _refreshes_in_flight:
+                return
+            _refreshes_in_flight.add(self.cache_key)
+
+        logger.info("Session is close to expiry, refreshing in background")
+        threading.Thread(target=self._background_refresh, args=(stale_session_id,), daemon=True).start()
+
+    def _record_session_use(self) -> None:
+        entry = session_cache.get(self.cache_key)
+        if not entry or not entry.get("ttl"):
+            return
+
+        now = time.time()
+        remaining = entry["exp"] - now
+        if REFRESH_AHEAD_SECONDS and remaining < REFRESH_AHEAD_SECONDS:
+            self._schedule_background_refresh(entry["sid"])
+        elif remaining < entry["ttl"] / 2:
+            # Salesforce resets the session timeout on any request made in the second half of it.
+            self._persist_entry(dict(entry, exp=now + entry["ttl"]))
+
+    def get_valid_session(self) -> Tuple[str, str]:
+        with timed("session_lookup"):
+            session_data = self._get_stored_session()
+        if not session_data:
+            session_data = self._coalesced_login()
+
+        self._record_session_use()
+        return session_data
+
+    def login(self) -> Tuple[str, str]:
+        # Unlike get_valid_session, never returns a session obtained by another caller, so the result proves these
+        # exact credentials. The new session still replaces the cached one for tools to reuse.
+        with _login_lock(self.cache_key):
+            session_data = self._login()
         if not session_data:
             logger.error("Failed to obtain session from Salesforce")
             raise Exception("Failed to obtain session from Salesforce")
-
-        logger.info("Successfully obtained new Salesforce session")
         return session_data
 
-    def refresh_session(self) -> Tuple[str, str]:
+    def refresh_session(self, stale_session_id: Optional[str] = None) -> Tuple[str, str]:
         logger.info("Force refreshing Salesforce session")
+        increment("session_refreshes")
 
-        self._clear_stored_session()
+        if stale_session_id is None:
+            session_data = self._get_stored_session()
+            stale_session_id = session_data[0] if session_data else None
 
-        new_session = self.get_valid_session()
+        new_session = self._coalesced_login(stale_session_id)
         logger.info("Salesforce session successfully refreshed")
         return new_session
+
+
+def _login_lock(cache_key: Tuple[str, str]) -> threading.Lock:
+    lock = _login_locks.get(cache_key)
+    if lock is None:
+        with _login_locks_guard:
+            lock = _login_locks.setdefault(cache_key, threading.Lock())
+    return lock
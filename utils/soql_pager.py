@@ -0,0 +1,134 @@
+import requests
+import logging
+import urllib.parse
+from collections.abc import Callable, Generator
+from typing import Any, Optional
+from dify_plugin.config.logger_format import plugin_logger_handler
+from utils.http_client import API_VERSION, get_http_client, get_timeout
+from utils.metrics import timed, increment
+from utils.record_stream import QueryResponseStream
+from utils.retry_policy import RetryPolicy, extract_error
+from utils.session_manager import SalesforceSessionManager
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(plugin_logger_handler)
+
+STREAM_CHUNK_BYTES = 64 * 1024
+MIN_BATCH_SIZE = 200
+MAX_BATCH_SIZE = 2000
+
+
+class SoqlPager:
+    def __init__(self, session_manager: SalesforceSessionManager, soql_query: str,
+                 batch_size: Optional[int] = None, max_records: Optional[int] = None,
+                 query_all: bool = False, retry_policy: Optional[RetryPolicy] = None,
+                 start_path: Optional[str] = None,
+                 record_transform: Optional[Callable[[dict[str, Any]], dict[str, Any]]] = None):
+        self.session_manager = session_manager
+        self.start_path = start_path
+        self.record_transform = record_transform
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.soql_query = soql_query
+        self.batch_size = self._clamp_batch_size(batch_size)
+        self.max_records = int(max_records) if max_records and int(max_records) > 0 else None
+        self.query_all = query_all
+        self.total_size = 0
+        self.records_returned = 0
+        self.batches_returned = 0
+        self.bytes_received = 0
+
+    @staticmethod
+    def _clamp_batch_size(batch_size: Optional[int]) -> Optional[int]:
+        if not batch_size:
+            return None
+        return max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, int(batch_size)))
+
+    def _headers(self, session_id: str) -> dict[str, str]:
+        headers = {
+            "Authorization": f"Bearer {session_id}",
+            "Content-Type": "application/json"
+        }
+        if self.batch_size:
+            headers["Sforce-Query-Options"] = f"batchSize={self.batch_size}"
+        return headers
+
+    def _first_page_path(self) -> str:
+        if self.start_path:
+            return self.start_path
+        endpoint = "queryAll" if self.query_all else "query"
+        encoded_query = urllib.parse.quote(self.soql_query)
+        return f"/services/data/{API_VERSION}/{endpoint}?q={encoded_query}"
+
+    def _make_api_call(self, session_id: str, instance_url: str, path: str) -> requests.Response:
+        logger.debug("Making Salesforce API call to: %s%s", instance_url, path.split('?')[0])
+        return get_http_client(instance_url).get(f"{instance_url}{path}", headers=self._headers(session_id),
+                                                 timeout=get_timeout(), stream=True)
+
+    def _read_page(self, response: requests.Response, limit: Optional[int]) -> dict[str, Any]:
+        try:
+            with timed("parse"):
+                stream = QueryResponseStream(response.iter_content(chunk_size=STREAM_CHUNK_BYTES))
+                if self.record_transform:
+                    records = [self.record_transform(record) for record in stream.records(limit)]
+                else:
+                    records = list(stream.records(limit))
+            self.bytes_received += stream.bytes_read
+            increment("bytes_received", stream.bytes_read)
+        finally:
+            response.close()
+
+        page = stream.meta
+        page["records"] = records
+        return page
+
+    def _fetch_page(self, path: str, limit: Optional[int] = None) -> dict[str, Any]:
+        response = self.retry_policy.execute(
+            self.session_manager,
+            lambda session_id, instance_url: self._make_api_call(session_id, instance_url, path))
+
+        logger.debug("Salesforce API response status: %d", response.status_code)
+
+        if response.status_code == 200:
+            return self._read_page(response, limit)
+
+        error_code, error_message = extract_error(response)
+        if response.status_code == 401:
+            logger.error("Unauthorized: Invalid or expired session")
+            raise Exception("Unauthorized: Invalid or expired session. Please check your credentials.")
+        elif response.status_code == 400:
+            logger.error(f"Bad request (400): {response.text[:200]}")
+            raise Exception(f"Invalid SOQL query: {error_message}")
+        else:
+            logger.error(f"Salesforce API error (status {response.status_code}): {response.text[:200]}")
+            raise Exception(f"Salesforce API error (status {response.status_code}, {error_code}): {error_message}")
+
+    def iter_batches(self) -> Generator[dict[str, Any], None, None]:
+        path = self._first_page_path()
+
+        while path:
+            limit = self.max_records - self.records_returned if self.max_records is not None else None
+            page = self._fetch_page(path, limit)
+            records = page.get("records", [])
+            next_records_url = page.get("nextRecordsUrl")
+
+            if self.batches_returned == 0:
+                self.total_size = page.get("totalSize", 0)
+
+            if limit is not None and len(records) >= limit:
+                next_records_url = None
+
+            self.records_returned += len(records)
+            self.batches_returned += 1
+            logger.debug("Fetched batch %d with %d record(s), %d/%d so far",
+                         self.batches_returned, len(records), self.records_returned, self.total_size)
+
+            yield {
+                "totalSize": self.total_size,
+                "done": next_records_url is None,
+                "records": records,
+                "batch": self.batches_returned,
+                "nextRecordsUrl": next_records_url,
+            }
+
+            path = next_records_url
@@ -0,0 +1,113 @@
+import re
+from typing import Optional
+
+CLAUSE_ORDER = ("SELECT", "FROM", "USING SCOPE", "WHERE", "WITH", "GROUP BY", "HAVING", "ORDER BY", "LIMIT",
+                "OFFSET", "FOR")
+
+_CLAUSE_PATTERN = re.compile(
+    r"(SELECT|FROM|USING\s+SCOPE|WHERE|WITH|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT|OFFSET|FOR)\b", re.IGNORECASE)
+_TYPEOF_PATTERN = re.compile(r"\bTYPEOF\b.*?\bEND\b", re.IGNORECASE | re.DOTALL)
+_AGGREGATE_PATTERN = re.compile(r"\b(COUNT|COUNT_DISTINCT|SUM|AVG|MIN|MAX)\s*\(", re.IGNORECASE)
+
+
+def _top_level_clauses(soql_query: str) -> list[tuple[str, int, int]]:
+    clauses = []
+    depth = 0
+    in_string = False
+    index = 0
+
+    while index < len(soql_query):
+        char = soql_query[index]
+        if in_string:
+            if char == "\\":
+                index += 1
+            elif char == "'":
+                in_string = False
+        elif char == "'":
+            in_string = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and (index == 0 or not (soql_query[index - 1].isalnum() or soql_query[index - 1] in "_.")):
+            match = _CLAUSE_PATTERN.match(soql_query, index)
+            if match:
+                keyword = " ".join(match.group(1).upper().split())
+                clauses.append((keyword, match.start(), match.end()))
+                index = match.end()
+                continue
+        index += 1
+
+    return clauses
+
+
+class SoqlStatement:
+    def __init__(self, clauses: dict[str, str]):
+        self.clauses = clauses
+
+    @classmethod
+    def parse(cls, soql_query: str) -> "SoqlStatement":
+        soql_query = soql_query.strip().rstrip(';').strip()
+        positions = _top_level_clauses(soql_query)
+        if not positions or positions[0][0] != "SELECT" or positions[0][1] != 0:
+            raise Exception("Invalid SOQL query. Query must start with SELECT.")
+
+        clauses = {}
+        for position, (keyword, _, body_start) in enumerate(positions):
+            body_end = positions[position + 1][1] if position + 1 < len(positions) else len(soql_query)
+            if keyword in clauses:
+                raise Exception(f"Invalid SOQL query. Duplicate {keyword} clause.")
+            clauses[keyword] = soql_query[body_start:body_end].strip()
+
+        if not clauses.get("FROM"):
+            raise Exception("Invalid SOQL query. Query must contain a FROM clause.")
+        return cls(clauses)
+
+    @property
+    def sobject(self) -> str:
+        return self.clauses["FROM"].split()[0]
+
+    @property
+    def fields(self) -> list[str]:
+        select = self.clauses["SELECT"]
+        # A polymorphic TYPEOF ... END block is one item even though it lists fields separated by commas.
+        typeof_spans = [(match.start(), match.end()) for match in _TYPEOF_PATTERN.finditer(select)]
+        fields = []
+        depth = 0
+        current = []
+        for index, char in enumerate(select):
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            if char == "," and depth == 0 and not any(start <= index < end for start, end in typeof_spans):
+                fields.append("".join(current).strip())
+                current = []
+            else:
+                current.append(char)
+        fields.append("".join(current).strip())
+        return [field for field in fields if field]
+
+    @property
+    def is_aggregate(self) -> bool:
+        return "GROUP BY" in self.clauses or bool(_AGGREGATE_PATTERN.search(self.clauses["SELECT"]))
+
+    def get(self, keyword: str) -> Optional[str]:
+        return self.clauses.get(keyword)
+
+    def replace(self, **clauses: Optional[str]) -> "SoqlStatement":
+        updated = dict(self.clauses)
+        for name, body in clauses.items():
+            keyword = name.upper().replace("_", " ")
+            if body is None:
+                updated.pop(keyword, None)
+            else:
+                updated[keyword] = body
+        return SoqlStatement(updated)
+
+    def and_where(self, condition: str) -> "SoqlStatement":
+        where = self.clauses.get("WHERE")
+        return self.replace(where=f"({where}) AND {condition}" if where else condition)
+
+    def to_soql(self) -> str:
+        return " ".join(f"{keyword} {self.clauses[keyword]}" for keyword in CLAUSE_ORDER if keyword in self.clauses)
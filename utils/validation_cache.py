@@ -0,0 +1,42 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any
+
+VALIDATION_TTL_SECONDS = float(os.getenv("SALESFORCE_VALIDATION_CACHE_TTL", "60"))
+
+
+def credential_fingerprint(credentials: dict[str, Any]) -> str:
+    values = {key: str(value).strip() for key, value in credentials.items()
+              if key.startswith("salesforce_") and value is not None}
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ValidationCache:
+    def __init__(self, ttl: float = VALIDATION_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def is_valid(self, fingerprint: str) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(fingerprint)
+            if expires_at is None or expires_at <= time.time():
+                self._entries.pop(fingerprint, None)
+                return False
+            return True
+
+    def put(self, fingerprint: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._entries = {key: value for key, value in self._entries.items() if value > now}
+            self._entries[fingerprint] = now + self.ttl
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+validation_cache = ValidationCache()